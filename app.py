@@ -1,7 +1,13 @@
-from flask import Flask, render_template, jsonify, request, session, redirect, url_for
-import json
+from flask import Flask, Response, abort, render_template, jsonify, request, session, redirect, url_for, g
 from team_simulator import TeamSimulator
-from models import DailyChallenge
+from models import get_challenge, get_challenge_manifest, get_pick_rates, get_score_distribution, LEADERBOARD_TOP_N, LEADERBOARD_PAGE_MAX
+from pool_snapshots import PoolReloader
+from submission_log import append_submission, get_player_submissions, start_compactor
+from challenge_scheduler import start_scheduler
+from leaderboard_snapshots import get_final_leaderboard
+from standings import WINDOWS, get_standings
+from rescoring import get_rescored_leaderboard, list_scoring_versions
+from lineups import lineup_of
 import os
 from flask_cors import CORS
 from datetime import datetime
@@ -20,7 +26,7 @@ CORS(app, resources={
         "origins": ["https://budgetgm.netlify.app", "http://localhost:3000"],
         "methods": ["GET", "POST", "OPTIONS"],
         "allow_headers": ["Content-Type", "Authorization", "Accept", "X-Requested-With"],
-        "expose_headers": ["Content-Type", "Authorization", "Accept"],
+        "expose_headers": ["Content-Type", "Authorization", "Accept", "X-Pool-Version"],
         "supports_credentials": False,
         "max_age": 600
     }
@@ -34,6 +40,20 @@ os.makedirs('data/challenges', exist_ok=True)
 # Initialize team simulator
 simulator = TeamSimulator()
 
+# Current player pool snapshot; reloaded when a new one is published
+pool_source = PoolReloader(check_interval=int(os.environ.get('POOL_CHECK_INTERVAL', 30)))
+
+# Fold the submission log into its snapshot in the background
+start_compactor(interval=int(os.environ.get('SUBMISSION_COMPACT_INTERVAL', 300)))
+
+# Generate upcoming days' challenges ahead of time so rollover is just a lookup
+start_scheduler(interval=int(os.environ.get('CHALLENGE_SCHEDULE_INTERVAL', 3600)))
+
+@app.before_request
+def bind_player_pool():
+    # Pin one pool snapshot for the whole request
+    g.pool = pool_source.current()
+
 @app.before_request
 def handle_preflight():
     if request.method == "OPTIONS":
@@ -51,19 +71,22 @@ def add_cors_headers(response):
     response.headers["Access-Control-Allow-Origin"] = "https://budgetgm.netlify.app"
     response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
     response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, Accept, X-Requested-With"
+    pool = g.get('pool')
+    if pool is not None:
+        response.headers["X-Pool-Version"] = pool.version
     return response
 
 @app.route('/')
 def index():
     # Get the current challenge
-    challenge = DailyChallenge()
+    challenge = get_challenge(pool=g.pool)
     
     # Check if user has already submitted for today
     player_name = session.get('player_name')
     has_submitted = False
     
     if player_name:
-        submission = challenge.get_player_submission(player_name)
+        submission = challenge.get_player_submission(player_name, pool=g.pool)
         has_submitted = submission is not None
     
     return render_template('index.html', 
@@ -90,7 +113,7 @@ def get_player_pool():
         logger.info('Request headers: %s', request.headers)
         
         # Get the full player pool
-        player_pool = simulator.player_pool
+        player_pool = g.pool.data
         if not player_pool:
             logger.error("Empty player pool")
             return jsonify({'error': 'Empty player pool'}), 500
@@ -178,33 +201,23 @@ def submit_team():
         if not record or 'wins' not in record or 'losses' not in record:
             return jsonify({'error': 'Invalid record data'}), 400
 
-        # Create data directory if it doesn't exist
-        if not os.path.exists('data'):
-            os.makedirs('data')
-
-        # Load existing submissions
-        submissions_file = 'data/submissions.json'
-        submissions = []
-        if os.path.exists(submissions_file):
-            try:
-                with open(submissions_file, 'r') as f:
-                    submissions = json.load(f)
-            except Exception as e:
-                logger.error(f"Error loading submissions: {str(e)}")
-
-        # Add new submission
+        challenge = get_challenge(pool=g.pool)
+        lineup = [_resolve_player(challenge, g.pool, player) for player in players]
+        unknown = [_player_label(player) for player, player_id in zip(players, lineup) if player_id is None]
+        if unknown:
+            return jsonify({'error': f"Unknown players: {', '.join(unknown)}"}), 400
+        if len(set(lineup)) != len(lineup):
+            return jsonify({'error': 'Team must have 5 different players'}), 400
+
+        # Append the new submission to today's log, as a lineup of pool ids rather than names
         submission = {
             'player_name': player_name,
-            'players': players,
+            'lineup': lineup_of(lineup),
             'record': record,
             'timestamp': datetime.now().isoformat()
         }
-        submissions.append(submission)
-
-        # Save updated submissions
         try:
-            with open(submissions_file, 'w') as f:
-                json.dump(submissions, f, indent=2)
+            append_submission(submission)
         except Exception as e:
             logger.error(f"Error saving submission: {str(e)}")
             return jsonify({'error': 'Failed to save submission'}), 500
@@ -215,37 +228,177 @@ def submit_team():
         logger.error(f"Error submitting team: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def _resolve_player(challenge, pool, player):
+    """
+    Pool id for a submitted player (a name or a player dict), or None.
+    Looked up in the challenge's pool first, then in the full pool, which
+    is what /api/player_pool serves.
+    """
+    queries = [player] if not isinstance(player, dict) else \
+        [query for query in (player.get('id'), player.get('name')) if query]
+    for query in queries:
+        player_id = challenge.resolve_player(query)
+        if player_id is not None:
+            return player_id
+    for query in queries:
+        pool_player = pool.find_player(query, fuzzy=False)
+        if pool_player is not None:
+            return pool_player['id']
+    return None
+
+def _player_label(player):
+    return str((player.get('name') or player.get('id')) if isinstance(player, dict) else player)
+
 @app.route('/leaderboard')
 def leaderboard():
     # Check if a date parameter is provided
     date = request.args.get('date')
+    try:
+        source = _leaderboard_source(date, _scoring_version_arg())
+    except ValueError as e:
+        abort(400, str(e))
+    except LookupError as e:
+        abort(404, str(e))
+    board, get_page, challenge_date, _ = source
     
-    if date:
-        # Load the challenge for the specified date
-        challenge = DailyChallenge(date)
-    else:
-        # Get the current challenge
-        challenge = DailyChallenge()
-    
-    leaderboard_data = challenge.get_leaderboard()
+    # Only one page of entries is rendered, however many people played
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        page = 1
+    total = len(board)
+    page_count = max(1, -(-total // LEADERBOARD_TOP_N))
+    page = min(page, page_count)
+    leaderboard_data = get_page((page - 1) * LEADERBOARD_TOP_N, LEADERBOARD_TOP_N)
     
     player_name = session.get('player_name')
     player_rank = None
     player_percentile = None
     
-    if player_name:
-        for i, submission in enumerate(leaderboard_data):
-            if submission['player_name'] == player_name:
-                player_rank = i + 1
-                player_percentile = submission.get('percentile', 0)
-                break
+    if player_name and player_name in board:
+        player_rank = board.rank(player_name)
+        player_percentile = board.percentile(player_name)
     
     return render_template('leaderboard.html', 
                           leaderboard=leaderboard_data,
+                          scoring_version=_scoring_version_arg(),
                           player_name=player_name,
                           player_rank=player_rank,
                           player_percentile=player_percentile,
-                          challenge_date=challenge.date)
+                          challenge_date=challenge_date,
+                          page=page,
+                          page_count=page_count,
+                          total_entries=total)
+
+@app.route('/api/leaderboard')
+def get_leaderboard_page():
+    """
+    One page of a day's leaderboard.
+    Query params: date (defaults to today), offset, limit (at most LEADERBOARD_PAGE_MAX),
+    scoring_version to rank the day as re-scored under that version (see rescoring.py),
+    around=<player name> to center the page on that player's entry instead of using offset.
+    """
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = max(1, min(int(request.args.get('limit', LEADERBOARD_TOP_N)), LEADERBOARD_PAGE_MAX))
+    except ValueError:
+        return jsonify({'error': 'Invalid offset or limit'}), 400
+    
+    try:
+        scoring_version = _scoring_version_arg()
+        board, get_page, challenge_date, version = _leaderboard_source(request.args.get('date'), scoring_version)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    around = request.args.get('around')
+    if around:
+        position = board.position(around)
+        if position is None:
+            return jsonify({'error': 'No entry for this player'}), 404
+        offset = max(0, position - limit // 2)
+    
+    return jsonify({
+        'date': challenge_date,
+        'version': version,  # None once the day is finalized
+        'scoring_version': scoring_version,  # None for the records as submitted
+        'total': len(board),
+        'offset': offset,
+        'limit': limit,
+        'entries': get_page(offset, limit)
+    })
+
+@app.route('/api/challenge/<date>/leaderboard')
+def get_final_leaderboard_document(date):
+    """A finished day's frozen leaderboard, served as the bytes written when it was finalized"""
+    final = get_final_leaderboard(date)
+    if final is None:
+        return jsonify({'error': 'Leaderboard not finalized; use /api/leaderboard'}), 404
+    return Response(final.raw, mimetype='application/json')
+
+@app.route('/api/standings')
+def get_player_standings():
+    """
+    Standings across finalized days.
+    Query params: window (7d, 30d or all), player to get one player's
+    standing and streaks, limit for the length of the top lists.
+    """
+    window = request.args.get('window', 'all')
+    if window not in WINDOWS:
+        return jsonify({'error': f"Invalid window; use one of {', '.join(WINDOWS)}"}), 400
+    
+    standings = get_standings()
+    player = request.args.get('player')
+    if player:
+        standing = standings.get_player(window, player)
+        if standing is None:
+            return jsonify({'error': 'No finalized days for this player in the window'}), 404
+        return jsonify({'window': window, 'as_of': standings.last_date(), 'standing': standing})
+    
+    try:
+        limit = max(1, min(int(request.args.get('limit', 25)), 100))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    top = standings.get_top(window) or {'as_of': None, 'mean_percentile': []}
+    return jsonify({
+        'window': window,
+        **{key: value[:limit] if isinstance(value, list) else value for key, value in top.items()}
+    })
+
+@app.route('/api/scoring_versions')
+def get_scoring_versions():
+    """Scoring versions past challenges have been re-scored under"""
+    return jsonify({'versions': list_scoring_versions()})
+
+def _scoring_version_arg():
+    """The scoring_version query param as an int, or None for the records as submitted"""
+    value = request.args.get('scoring_version')
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('Invalid scoring_version')
+
+def _leaderboard_source(date, scoring_version=None):
+    """
+    (ranking, get_page(offset, limit), date, version) for a day's leaderboard.
+    With a scoring_version the day is ranked by its re-scored records.
+    Finished days come from their frozen snapshot, without loading the
+    challenge; the current day from its live index.
+    """
+    if scoring_version is not None:
+        date = date or datetime.now().strftime('%Y-%m-%d')
+        rescored = get_rescored_leaderboard(date, scoring_version)
+        if rescored is None:
+            raise LookupError(f'No results for {date} under scoring version {scoring_version}')
+        return rescored, rescored.page, rescored.date, None
+    final = get_final_leaderboard(date) if date else None
+    if final is not None:
+        return final, final.page, final.date, None
+    challenge = get_challenge(date, pool=g.pool)
+    return challenge.leaderboard, challenge.get_leaderboard_page, challenge.date, challenge.version
 
 @app.route('/api/check_submission')
 def check_submission():
@@ -256,9 +409,9 @@ def check_submission():
         return jsonify({'error': 'Missing player name'}), 400
     
     # Get the challenge for the specified date or today
-    challenge = DailyChallenge(date) if date else DailyChallenge()
+    challenge = get_challenge(date, pool=g.pool)
     
-    submission = challenge.get_player_submission(player_name)
+    submission = challenge.get_player_submission(player_name, pool=g.pool)
     return jsonify({
         'has_submission': submission is not None,
         'submission': submission
@@ -273,35 +426,117 @@ def get_submitted_team():
         return jsonify({'error': 'Missing player name'}), 400
     
     # Get the challenge for the specified date or today
-    challenge = DailyChallenge(date) if date else DailyChallenge()
+    challenge = get_challenge(date, pool=g.pool)
     
-    submission = challenge.get_player_submission(player_name)
+    submission = challenge.get_player_submission(player_name, pool=g.pool)
     if not submission:
         return jsonify({'error': 'No submission found'}), 404
     
     return jsonify(submission)
 
+@app.route('/api/submission_history')
+def get_submission_history():
+    """Every team a player sent to /api/submit_team on a day (today by default), oldest first"""
+    player_name = request.args.get('player_name')
+    if not player_name:
+        return jsonify({'error': 'Missing player name'}), 400
+    date = request.args.get('date') or datetime.now().strftime('%Y-%m-%d')
+    return jsonify({'date': date, 'submissions': get_player_submissions(player_name, date)})
+
 @app.route('/api/available_dates')
 def get_available_dates():
-    challenge = DailyChallenge()
+    # summary=1 returns each date's entry count and best record as well
+    if request.args.get('summary') in ('1', 'true'):
+        return jsonify(get_challenge_manifest())
+    challenge = get_challenge(pool=g.pool)
     dates = challenge.get_available_dates()
     return jsonify(dates)
 
 @app.route('/api/challenge/<date>')
 def get_challenge_by_date(date):
-    challenge = DailyChallenge(date)
+    challenge = get_challenge(date, pool=g.pool)
     if not challenge.player_pool:
         return jsonify({'error': 'Challenge not found'}), 404
     
     return jsonify({
         'date': challenge.date,
-        'player_pool': challenge.player_pool
+        'player_pool': challenge.player_pool,
+        'meta': challenge.meta
+    })
+
+@app.route('/api/challenge/<date>/distribution')
+def get_challenge_distribution(date):
+    """Histogram of wins for a day's submissions, with mean and quantiles ('today' for the current challenge)"""
+    distribution = get_score_distribution(None if date == 'today' else date)
+    if distribution is None:
+        return jsonify({'error': 'Challenge not found'}), 404
+    return jsonify(distribution)
+
+@app.route('/api/challenge/<date>/picks')
+def get_challenge_picks(date):
+    """
+    How many managers picked each player (keyed by player id) and each pair
+    of players, for a day ('today' for the current challenge). pairs=0 skips
+    the pair counts.
+    """
+    picks = get_pick_rates(None if date == 'today' else date, pairs=request.args.get('pairs') not in ('0', 'false'))
+    if picks is None:
+        return jsonify({'error': 'Challenge not found'}), 404
+    return jsonify(picks)
+
+@app.route('/api/similar_players')
+def get_similar_players():
+    """
+    Players whose stats are closest to a given player's.
+    Query params: player (name or id), k, tier (e.g. $3), cheaper=1 to only
+    return players in lower tiers, date to only return players from that
+    day's challenge pool ('today' for the current challenge).
+    """
+    query = request.args.get('player')
+    if not query:
+        return jsonify({'error': 'Missing player'}), 400
+    
+    pool = g.pool
+    player = pool.find_player(query)
+    if player is None:
+        return jsonify({'error': 'Player not found'}), 404
+    
+    try:
+        k = max(1, min(int(request.args.get('k', 5)), 50))
+    except ValueError:
+        return jsonify({'error': 'Invalid k'}), 400
+    
+    similarity = pool.similarity
+    player_cost = int(similarity.costs[similarity.row_by_id[player['id']]])
+    tier = request.args.get('tier')
+    cost = int(tier.lstrip('$')) if tier and tier.lstrip('$').isdigit() else None
+    max_cost = player_cost - 1 if request.args.get('cheaper') in ('1', 'true') else None
+    
+    candidate_ids = None
+    date = request.args.get('date')
+    if date:
+        challenge = get_challenge(None if date == 'today' else date, pool=pool)
+        candidate_ids = [p['id'] for players in challenge.player_pool.values() for p in players]
+    
+    similar = []
+    for player_id, distance in similarity.query(player['id'], k, cost=cost, max_cost=max_cost, candidate_ids=candidate_ids):
+        similar_player = pool.players_by_id[player_id]
+        similar.append({
+            'id': player_id,
+            'name': similar_player['name'],
+            'cost': f"${int(similarity.costs[similarity.row_by_id[player_id]])}",
+            'distance': round(distance, 3),
+            'stats': similar_player['stats']
+        })
+    
+    return jsonify({
+        'player': {'id': player['id'], 'name': player['name'], 'cost': f"${player_cost}", 'stats': player['stats']},
+        'similar': similar
     })
 
 def load_player_pool():
     try:
-        with open('player_pool.json', 'r') as f:
-            full_pool = json.load(f)
+        full_pool = pool_source.current().data
             
         # Select 5 random players from each category
         limited_pool = {}
@@ -2,10 +2,13 @@ from nba_api.stats.endpoints import leaguedashplayerstats
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import json
+import logging
+import os
+from fetch_executor import RateLimitedExecutor, nba_api_limiter
 
 def get_player_stats(season):
     """Fetch player stats for a given season"""
+    nba_api_limiter.wait()
     stats = leaguedashplayerstats.LeagueDashPlayerStats(
         per_mode_detailed='PerGame',
         season=season,
@@ -14,85 +17,189 @@ def get_player_stats(season):
     )
     return pd.DataFrame(stats.get_data_frames()[0])
 
-def calculate_player_rating(player_stats):
+# Stat columns used for the player rating, in weight-matrix row order
+RATING_STATS = ['PTS', 'REB', 'AST', 'STL', 'BLK', 'FG_PCT', 'FG3_PCT', 'FT_PCT', 'TOV', 'GP']
+
+# Default rating weights
+DEFAULT_WEIGHTS = {
+    'PTS': 1.0,
+    'REB': 0.7,
+    'AST': 0.7,
+    'STL': 0.5,
+    'BLK': 0.5,
+    'FG_PCT': 0.4,
+    'FG3_PCT': 0.3,
+    'FT_PCT': 0.3,
+    'TOV': -0.3,
+    'GP': 0.1
+}
+
+# Multiplier applied to each weight: percentages are scaled to 0-100 and TOV is subtracted
+RATING_SCALE = {'FG_PCT': 100, 'FG3_PCT': 100, 'FT_PCT': 100, 'TOV': -1}
+
+TIERS = ['$5', '$4', '$3', '$2', '$1']
+
+# Share of the pool in each tier, best tier first
+TIER_SHARES = {
+    '$5': 0.1,    # Top 10%
+    '$4': 0.2,    # Next 20%
+    '$3': 0.3,    # Next 30%
+    '$2': 0.2,    # Next 20%
+    '$1': 0.2     # Bottom 20%
+}
+
+def weight_matrix(weight_sets):
+    """Build the (stats x K) coefficient matrix for a list of weight dicts"""
+    return np.array([
+        [weights.get(stat, 0.0) * RATING_SCALE.get(stat, 1) for weights in weight_sets]
+        for stat in RATING_STATS
+    ], dtype=float)
+
+def calculate_ratings(df, weight_sets=None):
+    """
+    Rate every player under K weight sets with one matrix product.
+    Returns an (n_players x K) array; players missing a stat get NaN.
+    """
+    weight_sets = weight_sets or [DEFAULT_WEIGHTS]
+    stats = df.reindex(columns=RATING_STATS).to_numpy(dtype=float)
+    return stats @ weight_matrix(weight_sets)
+
+def calculate_player_rating(player_stats, weights=None):
     """Calculate a comprehensive player rating based on multiple statistics"""
-    # Weights for different statistics
-    weights = {
-        'PTS': 1.0,
-        'REB': 0.7,
-        'AST': 0.7,
-        'STL': 0.5,
-        'BLK': 0.5,
-        'FG_PCT': 0.4,
-        'FG3_PCT': 0.3,
-        'FT_PCT': 0.3,
-        'TOV': -0.3,
-        'GP': 0.1
-    }
+    if any(stat not in player_stats for stat in RATING_STATS):
+        return 0
+    stats = np.array([player_stats[stat] for stat in RATING_STATS], dtype=float)
+    return float(stats @ weight_matrix([weights or DEFAULT_WEIGHTS])[:, 0])
+
+def tier_counts(num_players):
+    """Number of players in each tier for a pool of num_players"""
+    return {tier: int(num_players * share) for tier, share in TIER_SHARES.items()}
+
+def assign_tiers(ratings, num_players=500):
+    """
+    Assign tiers for every column of an (n_players x K) rating array.
+    Returns an (n_players x K) array of tier indexes into TIERS, -1 for players
+    outside the pool. Players with a NaN rating are never in the pool, and
+    tiers are sized for the pool actually filled (see tier_counts).
+    """
+    unrated = np.isnan(ratings)
+    ratings = np.where(unrated, -np.inf, ratings)
+    n, k = ratings.shape
+    # A missing stat makes a player's rating NaN under every weight set, so each column has the same rated count
+    num_players = min(num_players, int((~unrated).sum(axis=0).min()) if k else n)
     
-    try:
-        # Calculate weighted score
-        score = (
-            player_stats['PTS'] * weights['PTS'] +
-            player_stats['REB'] * weights['REB'] +
-            player_stats['AST'] * weights['AST'] +
-            player_stats['STL'] * weights['STL'] +
-            player_stats['BLK'] * weights['BLK'] +
-            player_stats['FG_PCT'] * weights['FG_PCT'] * 100 +
-            player_stats['FG3_PCT'] * weights['FG3_PCT'] * 100 +
-            player_stats['FT_PCT'] * weights['FT_PCT'] * 100 -
-            player_stats['TOV'] * weights['TOV'] +
-            player_stats['GP'] * weights['GP']
-        )
-    except:
-        score = 0
-    
-    return score
-
-def categorize_players(df, num_players=500):
-    """Categorize players into tiers based on their ratings"""
-    # Calculate player ratings
-    df['RATING'] = df.apply(calculate_player_rating, axis=1)
-    
-    # Sort by rating and get top players
-    top_players = df.nlargest(num_players, 'RATING')
-    
-    # Calculate number of players per tier
-    tier_counts = {
-        '$5': int(num_players * 0.1),    # Top 10%
-        '$4': int(num_players * 0.2),    # Next 20%
-        '$3': int(num_players * 0.3),    # Next 30%
-        '$2': int(num_players * 0.2),    # Next 20%
-        '$1': int(num_players * 0.2)     # Bottom 20%
+    # Tier index for each pool position; rounding leftovers fall into $1
+    by_position = np.full(num_players, len(TIERS) - 1, dtype=np.int8)
+    current_idx = 0
+    for tier_idx, size in enumerate(tier_counts(num_players).values()):
+        by_position[current_idx:current_idx + size] = tier_idx
+        current_idx += size
+    
+    order = np.argsort(-ratings, axis=0, kind='stable')[:num_players]
+    tiers = np.full((n, k), -1, dtype=np.int8)
+    tiers[order, np.arange(k)] = by_position[:, None]
+    tiers[unrated] = -1
+    return tiers
+
+def tier_churn(tiers, baseline=0):
+    """
+    Compare every weight set's tier assignment against a baseline column.
+    Returns per-weight-set arrays of players whose tier changed, who entered
+    or left the pool, and the mean absolute tier shift of players kept in it.
+    """
+    base = tiers[:, [baseline]]
+    in_base = base >= 0
+    in_pool = tiers >= 0
+    kept = in_base & in_pool
+    shift = np.abs(tiers.astype(np.int16) - base)
+    kept_count = kept.sum(axis=0)
+    return {
+        'changed': ((tiers != base) & kept).sum(axis=0),
+        'entered': (in_pool & ~in_base).sum(axis=0),
+        'left': (in_base & ~in_pool).sum(axis=0),
+        'changed_pct': 100 * ((tiers != base) & kept).sum(axis=0) / np.maximum(kept_count, 1),
+        'mean_shift': (shift * kept).sum(axis=0) / np.maximum(kept_count, 1)
     }
+
+def compare_weight_sets(df, weight_sets, num_players=500, baseline=0):
+    """
+    Rate and tier players under every candidate weight set in one pass and
+    report tier churn of each candidate against the baseline weight set
+    """
+    ratings = calculate_ratings(df, weight_sets)
+    tiers = assign_tiers(ratings, num_players)
+    return ratings, tiers, tier_churn(tiers, baseline)
+
+def categorize_players(df, num_players=500, weights=None):
+    """Categorize players into tiers based on their ratings"""
+    # Calculate player ratings; players missing a stat get NaN and are left out of the pool
+    ratings = calculate_ratings(df, [weights or DEFAULT_WEIGHTS])
+    df['RATING'] = ratings[:, 0]
     
-    # Assign tiers
-    top_players['TIER'] = None
-    current_idx = 0
+    # Tier the top players exactly as compare_weight_sets does, best first
+    tiers = assign_tiers(ratings, num_players)[:, 0]
+    in_pool = tiers >= 0
+    top_players = df[in_pool].copy()
+    top_players['TIER'] = np.array(TIERS)[tiers[in_pool]]
+    return top_players.sort_values('RATING', ascending=False, kind='stable')
+
+# Completed seasons never change, so their frames are cached here
+SEASON_CACHE_DIR = 'data/seasons'
+
+# Upper bound on concurrent season fetches
+MAX_SEASON_WORKERS = 4
+
+NUMERIC_COLUMNS = ['GP', 'MIN', 'PTS', 'REB', 'AST', 'STL', 'BLK', 'FG_PCT', 'FG3_PCT', 'FT_PCT', 'TOV']
+
+def get_current_season(today=None):
+    """Get the in-progress (or most recent) season, e.g. '2024-25'"""
+    today = today or datetime.now()
+    start_year = today.year - 1 if today.month < 10 else today.year
+    return f"{start_year}-{str(start_year + 1)[2:]}"
+
+def get_recent_seasons(count=3, today=None):
+    """Get the last `count` seasons, current season first"""
+    start_year = int(get_current_season(today)[:4])
+    return [f"{year}-{str(year + 1)[2:]}" for year in range(start_year, start_year - count, -1)]
+
+def load_season_stats(season, use_cache=True, cache_dir=SEASON_CACHE_DIR):
+    """
+    Get numeric player stats for one season. Completed seasons are read from
+    the on-disk cache when present and written to it after fetching.
+    """
+    cache_file = os.path.join(cache_dir, f'{season}.csv')
+    completed = season != get_current_season()
     
-    for tier, size in tier_counts.items():
-        top_players.iloc[current_idx:current_idx + size, -1] = tier
-        current_idx += size
+    if use_cache and completed and os.path.exists(cache_file):
+        print(f"Using cached stats for season {season}")
+        return pd.read_csv(cache_file)
     
-    # Fill any remaining players (due to rounding) with $1 tier
-    top_players['TIER'] = top_players['TIER'].fillna('$1')
+    print(f"Fetching stats for season {season}...")
+    stats = get_player_stats(season)
     
-    return top_players
+    # Convert numeric columns to float
+    for col in NUMERIC_COLUMNS:
+        stats[col] = pd.to_numeric(stats[col], errors='coerce')
+    
+    if completed:
+        os.makedirs(cache_dir, exist_ok=True)
+        stats.to_csv(cache_file, index=False)
+    
+    return stats
 
-def get_multi_season_stats(seasons):
-    """Get stats across multiple seasons and average them"""
-    all_stats = []
+def get_multi_season_stats(seasons, use_cache=True, executor=None):
+    """
+    Get stats across multiple seasons and average them. Seasons are loaded
+    concurrently on a rate-limited executor; results keep the order of `seasons`.
+    """
+    def load(season):
+        return load_season_stats(season, use_cache)
     
-    for season in seasons:
-        print(f"Fetching stats for season {season}...")
-        stats = get_player_stats(season)
-        
-        # Convert numeric columns to float
-        numeric_columns = ['GP', 'MIN', 'PTS', 'REB', 'AST', 'STL', 'BLK', 'FG_PCT', 'FG3_PCT', 'FT_PCT', 'TOV']
-        for col in numeric_columns:
-            stats[col] = pd.to_numeric(stats[col], errors='coerce')
-        
-        all_stats.append(stats)
+    if executor is not None:
+        all_stats = executor.map(load, seasons)
+    else:
+        with RateLimitedExecutor(max_workers=max(1, min(len(seasons), MAX_SEASON_WORKERS))) as season_executor:
+            all_stats = season_executor.map(load, seasons)
     
     # Combine and average stats across seasons
     combined_stats = pd.concat(all_stats)
@@ -148,40 +255,53 @@ def convert_to_json_format(df):
     
     return player_pool
 
+def diff_player_pools(old_pool, new_pool):
+    """Report tier changes, new players and dropped players between two pools"""
+    def tiers_by_id(pool):
+        return {
+            player['id']: (tier, player['name'])
+            for tier, players in pool.items()
+            for player in players
+        }
+    
+    old_tiers = tiers_by_id(old_pool)
+    new_tiers = tiers_by_id(new_pool)
+    
+    return {
+        'tier_changes': [
+            {'id': player_id, 'name': name, 'old_tier': old_tiers[player_id][0], 'new_tier': tier}
+            for player_id, (tier, name) in new_tiers.items()
+            if player_id in old_tiers and old_tiers[player_id][0] != tier
+        ],
+        'new_players': [
+            {'id': player_id, 'name': name, 'tier': tier}
+            for player_id, (tier, name) in new_tiers.items()
+            if player_id not in old_tiers
+        ],
+        'dropped_players': [
+            {'id': player_id, 'name': name, 'tier': tier}
+            for player_id, (tier, name) in old_tiers.items()
+            if player_id not in new_tiers
+        ]
+    }
+
 def main():
-    # Get current season
-    current_year = datetime.now().year
-    current_month = datetime.now().month
-    current_season = f"{current_year-1}-{str(current_year)[2:]}" if current_month < 10 else f"{current_year}-{str(current_year+1)[2:]}"
-    
-    # Get stats for last 3 seasons
-    seasons = [
-        current_season,
-        f"{int(current_season[:4])-1}-{str(int(current_season[:4]))[-2:]}",
-        f"{int(current_season[:4])-2}-{str(int(current_season[:4])-1)[-2:]}"
-    ]
-    
-    # Get and process stats
-    print("Fetching player statistics for the last 3 seasons...")
-    avg_stats = get_multi_season_stats(seasons)
-    print("Categorizing players...")
-    categorized_players = categorize_players(avg_stats)
-    
-    # Convert to JSON format
-    print("Converting to JSON format...")
-    json_data = convert_to_json_format(categorized_players)
-    
-    # Save to JSON file
-    with open('player_pool.json', 'w') as f:
-        json.dump(json_data, f, indent=2)
-    
-    print("\nResults saved to 'player_pool.json'")
+    # One rebuild path: player_pool_data also publishes the snapshot and writes the diff report
+    from player_pool_data import build_player_pool
+    
+    logging.basicConfig(level=logging.INFO)
+    print("Building the player pool from the last 3 seasons...")
+    json_data = build_player_pool()
+    
+    print("\nResults saved to 'player_pool.json' and 'player_pool.bin'")
     
     # Print summary
-    for tier in ['$5', '$4', '$3', '$2', '$1']:
-        tier_players = categorized_players[categorized_players['TIER'] == tier]
+    for tier in TIERS:
+        tier_players = json_data.get(tier, [])
         print(f"\n{tier} Tier Players ({len(tier_players)}):")
-        print(tier_players[['PLAYER_NAME', 'RATING', 'PTS', 'REB', 'AST']].head().to_string())
+        for player in tier_players[:5]:
+            stats = player['stats']
+            print(f"  {player['name']}: {stats['points']:.1f} PTS, {stats['rebounds']:.1f} REB, {stats['assists']:.1f} AST")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
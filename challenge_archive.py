@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Compressed monthly archives of old daily challenges.
+
+Challenges older than ARCHIVE_AFTER_DAYS are moved out of the SQLite store
+into data/archive/<YYYY-MM>.zip, one deflated <date>.json member per day
+(player pool, pool version, submissions, the submission log and the frozen
+leaderboard). A zip's central directory gives random access to a single
+day without decompressing the rest of the month. The store keeps each
+archived day's manifest row and histogram, and reads its pool and
+submissions back from the archive on demand; the day's files under data/
+are removed once the archive holds them.
+"""
+import argparse
+import fcntl
+import json
+import os
+import zipfile
+from datetime import datetime, timedelta
+
+ARCHIVE_DIR = 'data/archive'
+ARCHIVE_AFTER_DAYS = int(os.environ.get('CHALLENGE_ARCHIVE_DAYS', 30))
+
+def archive_month(date):
+    return date[:7]
+
+def archive_path(month, archive_dir=ARCHIVE_DIR):
+    return os.path.join(archive_dir, f'{month}.zip')
+
+def write_archive(month, challenges, archive_dir=ARCHIVE_DIR):
+    """
+    Add {date: challenge} to a month's archive, replacing days already in it.
+    The zip is rewritten to a temporary file and swapped in, so readers
+    never see a partial archive.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = archive_path(month, archive_dir)
+    with open(os.path.join(archive_dir, f'{month}.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        
+        members = {}
+        if os.path.exists(path):
+            with zipfile.ZipFile(path, 'r') as archive:
+                members = {name: archive.read(name) for name in archive.namelist()}
+        for date, challenge in challenges.items():
+            members[f'{date}.json'] = json.dumps(challenge, separators=(',', ':')).encode('utf-8')
+        
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+            for name in sorted(members):
+                archive.writestr(name, members[name])
+        os.replace(tmp_path, path)
+
+def read_archived(date, archive_dir=ARCHIVE_DIR):
+    """
+    Get one archived day as {'player_pool', 'pool_version', 'submissions',
+    'submission_log', 'final_leaderboard'}, or None
+    """
+    try:
+        with zipfile.ZipFile(archive_path(archive_month(date), archive_dir), 'r') as archive:
+            return json.loads(archive.read(f'{date}.json'))
+    except (FileNotFoundError, KeyError):
+        return None
+
+def archive_old_challenges(store=None, days=ARCHIVE_AFTER_DAYS, today=None):
+    """Move every challenge older than `days` days into its monthly archive. Returns the dates moved."""
+    from leaderboard_snapshots import leaderboard_path
+    from submission_log import read_submissions
+    if store is None:
+        from challenge_store import get_store
+        store = get_store()
+    today = today or datetime.now()
+    cutoff = (today - timedelta(days=days)).strftime('%Y-%m-%d')
+    
+    by_month = {}
+    for date in store.list_unarchived_dates(before=cutoff):
+        by_month.setdefault(archive_month(date), []).append(date)
+    
+    archived = []
+    for month, dates in sorted(by_month.items()):
+        challenges = {}
+        for date in dates:
+            data = store.get_challenge(date)
+            challenges[date] = {
+                'player_pool': data['player_pool'],
+                'pool_version': data['pool_version'],
+                'submissions': store.get_submissions(date),
+                'submission_log': read_submissions(date),
+                'final_leaderboard': _read_json(leaderboard_path(date))
+            }
+        write_archive(month, challenges)
+        # Only drop rows and files once the archive holding them is in place
+        for date in dates:
+            store.mark_archived(date, month)
+            remove_day_files(date)
+        archived.extend(dates)
+    return archived
+
+def _read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def remove_day_files(date):
+    """Delete an archived day's submission log, index, frozen leaderboard and lock files"""
+    from leaderboard_snapshots import leaderboard_path
+    from singleflight import LOCK_DIR
+    from submission_log import index_path, log_path
+    paths = [
+        log_path(date),
+        index_path(date),
+        leaderboard_path(date),
+        os.path.join(LOCK_DIR, f'submissions-{date}.lock'),
+        os.path.join(LOCK_DIR, f'challenge-{date}.lock')
+    ]
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old daily challenges into compressed monthly archives")
+    parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="archive challenges older than this many days")
+    args = parser.parse_args()
+    
+    archived = archive_old_challenges(days=args.days)
+    print(f"Archived {len(archived)} challenges into {ARCHIVE_DIR}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Generates daily challenges ahead of time.
+
+Each run makes sure the next PREGENERATE_DAYS days (today included) exist
+in the challenge store, together with their precomputed metadata:
+how many lineups fit the budget, the best achievable record and the
+spread of expected records (see team_scoring.challenge_metadata). When a
+day starts, serving it is a plain store lookup; nothing is sampled or
+scored on the request path. The same pass freezes the leaderboards of
+days that have ended (see leaderboard_snapshots) and moves days older than
+CHALLENGE_ARCHIVE_DAYS into the monthly archives (see challenge_archive).
+"""
+import argparse
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from challenge_archive import archive_old_challenges
+from challenge_store import get_store
+from leaderboard_snapshots import finalize_pending
+from models import DailyChallenge
+from singleflight import file_lock
+from team_scoring import SCORING_VERSION, challenge_metadata
+
+PREGENERATE_DAYS = int(os.environ.get('CHALLENGE_PREGENERATE_DAYS', 7))
+
+logger = logging.getLogger(__name__)
+
+def upcoming_dates(days=PREGENERATE_DAYS, today=None):
+    today = today or datetime.now()
+    return [(today + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days)]
+
+def pregenerate(days=PREGENERATE_DAYS, today=None, pool=None, store=None):
+    """
+    Create any missing challenges for the next `days` days and fill in
+    missing or outdated metadata. Returns the dates that were written.
+    """
+    store = store or get_store()
+    written = []
+    for date in upcoming_dates(days, today):
+        data = store.get_challenge(date)
+        if data is None:
+            # Creating is race-safe: if another worker got there first we load theirs
+            player_pool = DailyChallenge(date, pool=pool).player_pool
+            meta = None
+        else:
+            player_pool = data['player_pool']
+            meta = data.get('meta')
+        
+        if meta is None or meta.get('scoring_version') != SCORING_VERSION:
+            store.set_meta(date, challenge_metadata(player_pool))
+            written.append(date)
+    return written
+
+def start_scheduler(days=PREGENERATE_DAYS, interval=3600):
+    """Run pregenerate now and then every `interval` seconds on a daemon thread"""
+    def run():
+        stop = threading.Event()
+        while True:
+            try:
+                # Every worker runs a scheduler; whichever holds the lock does the work
+                with file_lock('challenge-scheduler', blocking=False) as acquired:
+                    finalized = finalize_pending() if acquired else []
+                    written = pregenerate(days) if acquired else []
+                    archived = archive_old_challenges() if acquired else []
+                if finalized:
+                    logger.info(f"Finalized leaderboards for {', '.join(finalized)}")
+                if archived:
+                    logger.info(f"Archived challenges for {', '.join(archived)}")
+                if written:
+                    logger.info(f"Pre-generated challenges for {', '.join(written)}")
+            except Exception as e:
+                logger.error(f"Error pre-generating challenges: {str(e)}")
+            if stop.wait(interval):
+                break
+    
+    thread = threading.Thread(target=run, name='challenge-scheduler', daemon=True)
+    thread.start()
+    return thread
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the next days' daily challenges ahead of time")
+    parser.add_argument('--days', type=int, default=PREGENERATE_DAYS, help="number of days to generate, today included")
+    args = parser.parse_args()
+    
+    store = get_store()
+    pregenerate(args.days, store=store)
+    for date in upcoming_dates(args.days):
+        meta = store.get_challenge(date)['meta']
+        best = meta['best_record']
+        print(f"{date}: {meta['feasible_lineups']} feasible lineups, "
+              f"best {best['wins']}-{best['losses']}" if best else f"{date}: no feasible lineups")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Deterministic daily challenge rosters.
+
+A day's players are a pure function of (date, pool version, secret salt)
+and the rosters of the previous RECENT_CHALLENGE_DAYS days: the first three
+are hashed into a seed for a random.Random that samples each tier of the
+pool snapshot in a fixed order, skipping players used in those recent
+challenges. Any worker holding the same snapshot derives the same roster
+in microseconds, so workers racing to create a day can never disagree. The copy in the challenge store is a
+cache and an audit record; `python challenge_seed.py verify` re-derives
+every stored day whose pool snapshot is still available and reports any
+that differ. Without CHALLENGE_SALT anyone can derive future rosters from
+the public pool, so an unset salt is logged as a warning at import.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from pool_sampling import sample_players
+
+CHALLENGE_SALT = os.environ.get('CHALLENGE_SALT', '')
+CHALLENGE_TIERS = ['$5', '$4', '$3', '$2', '$1']
+PLAYERS_PER_TIER = 5
+RECENT_CHALLENGE_DAYS = int(os.environ.get('CHALLENGE_RECENT_DAYS', 3))  # Players sit out this many days after appearing
+
+logger = logging.getLogger(__name__)
+
+if not CHALLENGE_SALT:
+    logger.warning("CHALLENGE_SALT is not set; future daily challenges can be predicted from the public "
+                   "player pool. Set CHALLENGE_SALT to a secret value in production.")
+
+def challenge_seed(date, pool_version, salt=None):
+    """Integer seed for a date's roster"""
+    salt = CHALLENGE_SALT if salt is None else salt
+    digest = hashlib.sha256(f'{date}|{pool_version}|{salt}'.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+def get_recent_player_ids(store, date, days=RECENT_CHALLENGE_DAYS):
+    """Ids of the players in the stored challenges of the `days` days before date"""
+    player_ids = set()
+    current = datetime.strptime(date, '%Y-%m-%d')
+    for offset in range(1, days + 1):
+        data = store.get_challenge((current - timedelta(days=offset)).strftime('%Y-%m-%d'))
+        if not data:
+            continue
+        for players in data['player_pool'].values():
+            player_ids.update(player['id'] for player in players if 'id' in player)
+    return player_ids
+
+def derive_player_pool(pool, date, salt=None, per_tier=PLAYERS_PER_TIER, exclude=None):
+    """
+    The roster for a date, drawn from a PoolSnapshot.
+    Tier lists keep their order within a snapshot version, so the same
+    seed always picks the same players. Players whose ids are in exclude
+    (see get_recent_player_ids) are not picked while the tier has others.
+    """
+    rng = random.Random(challenge_seed(date, pool.version, salt))
+    return {
+        tier: sample_players(pool.data.get(tier, []), per_tier, rng=rng, exclude=exclude,
+                             key=lambda player: player.get('id'))
+        for tier in CHALLENGE_TIERS
+    }
+
+def verify(store=None, salt=None):
+    """
+    Re-derive every stored challenge whose pool snapshot is still on disk.
+    Returns (dates checked, dates whose stored roster differs).
+    """
+    from challenge_store import get_store
+    from pool_snapshots import load_snapshot_version
+    store = store or get_store()
+    
+    snapshots = {}
+    checked, mismatched = [], []
+    for date in sorted(store.list_dates()):
+        data = store.get_challenge(date)
+        version = data['pool_version']
+        if version not in snapshots:
+            snapshots[version] = load_snapshot_version(version) if version else None
+        if snapshots[version] is None:
+            continue
+        
+        checked.append(date)
+        expected = derive_player_pool(snapshots[version], date, salt, exclude=get_recent_player_ids(store, date))
+        stored = {tier: [player.get('id') for player in players] for tier, players in data['player_pool'].items()}
+        if stored != {tier: [player.get('id') for player in players] for tier, players in expected.items()}:
+            mismatched.append(date)
+    return checked, mismatched
+
+def main():
+    parser = argparse.ArgumentParser(description="Check stored daily challenges against their derived rosters")
+    parser.add_argument('command', choices=['verify'])
+    parser.parse_args()
+    
+    checked, mismatched = verify()
+    print(f"Checked {len(checked)} challenges, {len(mismatched)} differ from their derived roster")
+    for date in mismatched:
+        print(f"  {date}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,533 @@
+"""
+SQLite storage for daily challenges and their submissions.
+
+The database runs in WAL mode, so gunicorn workers can read while one of
+them writes. Each submission is a single-row upsert instead of a rewrite
+of the whole challenge. Every write to a day bumps that challenge's
+`version`, which per-worker caches use to tell whether their copy is stale.
+A per-day histogram of wins, and per-day counts of how often each player
+and each pair of players was picked, are adjusted in the same transaction
+as each submission, so neither the score distribution nor pick rates ever
+need a scan of the day.
+
+Submissions are stored normalized (see lineups.py): the team is a
+reference into a per-day table of distinct lineups, each a sorted list of
+player ids, and no player details or stats are copied into submissions.
+
+Each challenge row doubles as the date manifest: it carries the day's entry
+count and best record, kept current by the same transactions. Days moved
+into a monthly archive (see challenge_archive.py) keep that row and their
+histogram; their pool and submissions are read back from the archive.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from challenge_archive import read_archived
+from lineups import normalize_submission
+from score_distribution import SEASON_GAMES, empty_histogram, wins_bucket
+
+DB_PATH = os.environ.get('BUDGET_GM_DB', 'data/budget_gm.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS challenges (
+    date TEXT PRIMARY KEY,
+    player_pool TEXT NOT NULL,
+    pool_version TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    entries INTEGER NOT NULL DEFAULT 0,
+    top_wins INTEGER,
+    top_losses INTEGER,
+    archive TEXT,
+    meta TEXT,
+    finalized_at TEXT
+);
+CREATE TABLE IF NOT EXISTS submissions (
+    date TEXT NOT NULL,
+    player_name TEXT NOT NULL,
+    wins INTEGER,
+    losses INTEGER,
+    data TEXT NOT NULL,
+    timestamp TEXT,
+    lineup_id INTEGER,
+    PRIMARY KEY (date, player_name)
+);
+CREATE TABLE IF NOT EXISTS lineups (
+    date TEXT NOT NULL,
+    lineup_id INTEGER NOT NULL,
+    player_ids TEXT NOT NULL,
+    PRIMARY KEY (date, lineup_id),
+    UNIQUE (date, player_ids)
+);
+CREATE INDEX IF NOT EXISTS submissions_by_wins ON submissions (date, wins DESC, losses ASC);
+CREATE TABLE IF NOT EXISTS wins_histogram (
+    date TEXT NOT NULL,
+    wins INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (date, wins)
+);
+CREATE TABLE IF NOT EXISTS pick_counts (
+    date TEXT NOT NULL,
+    player TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (date, player)
+);
+CREATE TABLE IF NOT EXISTS pair_counts (
+    date TEXT NOT NULL,
+    player_a TEXT NOT NULL,
+    player_b TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (date, player_a, player_b)
+);
+"""
+
+
+class ChallengeStore:
+    """Challenges and submissions in a local SQLite database"""
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            tables = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            conn.executescript(SCHEMA)
+            # Databases created before these tables existed
+            self._normalize_submissions(conn)
+            if 'wins_histogram' not in tables:
+                self._rebuild_histogram(conn)
+            if 'pick_counts' not in tables:
+                self._rebuild_pick_counts(conn)
+            self._add_manifest_columns(conn)
+    
+    def _connect(self):
+        """One connection per thread; sqlite3 connections must not be shared across threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def _normalize_submissions(self, conn):
+        """Move submissions stored with full player lists over to interned lineups"""
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(submissions)')}
+        if 'lineup_id' in columns:
+            return
+        conn.execute('ALTER TABLE submissions ADD COLUMN lineup_id INTEGER')
+        for row in conn.execute('SELECT rowid, date, data FROM submissions').fetchall():
+            lineup_id, data = self._prepare_submission(conn, row['date'], json.loads(row['data']))[:2]
+            conn.execute('UPDATE submissions SET lineup_id = ?, data = ? WHERE rowid = ?', (lineup_id, data, row['rowid']))
+    
+    def _intern_lineup(self, conn, date, lineup):
+        """
+        The day's id for a lineup, adding it to the lineups table if it is new.
+        The next id is picked inside the INSERT itself, so a writer that loses
+        a race to add the same lineup reads the winner's id instead of failing.
+        """
+        player_ids = json.dumps(list(lineup), separators=(',', ':'))
+        conn.execute(
+            'INSERT INTO lineups (date, lineup_id, player_ids) '
+            'SELECT ?, COALESCE(MAX(lineup_id), 0) + 1, ? FROM lineups WHERE date = ? '
+            'ON CONFLICT(date, player_ids) DO NOTHING',
+            (date, player_ids, date)
+        )
+        return conn.execute(
+            'SELECT lineup_id FROM lineups WHERE date = ? AND player_ids = ?', (date, player_ids)
+        ).fetchone()['lineup_id']
+    
+    def _prepare_submission(self, conn, date, submission):
+        """(lineup_id, data JSON without players, lineup) for storing a submission"""
+        normalized = normalize_submission(submission)
+        lineup = normalized.pop('lineup')
+        lineup_id = self._intern_lineup(conn, date, lineup) if lineup else None
+        return lineup_id, json.dumps(normalized, separators=(',', ':')), lineup
+    
+    def _lineup(self, conn, date, lineup_id):
+        if lineup_id is None:
+            return ()
+        row = conn.execute(
+            'SELECT player_ids FROM lineups WHERE date = ? AND lineup_id = ?', (date, lineup_id)
+        ).fetchone()
+        return () if row is None else tuple(json.loads(row['player_ids']))
+    
+    def _add_manifest_columns(self, conn):
+        """Add and backfill the manifest columns on databases created before they existed"""
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(challenges)')}
+        if 'meta' not in columns:
+            conn.execute('ALTER TABLE challenges ADD COLUMN meta TEXT')
+        if 'finalized_at' not in columns:
+            conn.execute('ALTER TABLE challenges ADD COLUMN finalized_at TEXT')
+        if 'entries' in columns:
+            return
+        conn.execute('ALTER TABLE challenges ADD COLUMN entries INTEGER NOT NULL DEFAULT 0')
+        conn.execute('ALTER TABLE challenges ADD COLUMN top_wins INTEGER')
+        conn.execute('ALTER TABLE challenges ADD COLUMN top_losses INTEGER')
+        conn.execute('ALTER TABLE challenges ADD COLUMN archive TEXT')
+        for row in conn.execute('SELECT date FROM challenges').fetchall():
+            self._refresh_summary(conn, row['date'])
+    
+    def _refresh_summary(self, conn, date):
+        """Recount a day's entries and best record"""
+        conn.execute(
+            'UPDATE challenges SET entries = (SELECT COUNT(*) FROM submissions WHERE date = ?) WHERE date = ?',
+            (date, date)
+        )
+        self._refresh_top_record(conn, date)
+    
+    def _refresh_top_record(self, conn, date):
+        # Served by the submissions_by_wins index, so this is one index probe
+        top = conn.execute(
+            'SELECT wins, losses FROM submissions WHERE date = ? AND wins IS NOT NULL '
+            'ORDER BY wins DESC, losses ASC LIMIT 1', (date,)
+        ).fetchone()
+        conn.execute(
+            'UPDATE challenges SET top_wins = ?, top_losses = ? WHERE date = ?',
+            (top['wins'] if top else None, top['losses'] if top else None, date)
+        )
+    
+    def _archived(self, date):
+        """The archived copy of a day, or None if the day is still in the database"""
+        row = self._connect().execute('SELECT archive FROM challenges WHERE date = ?', (date,)).fetchone()
+        if row is None or row['archive'] is None:
+            return None
+        return read_archived(date) or {'player_pool': {}, 'pool_version': None, 'submissions': {}}
+    
+    def connection(self):
+        """This thread's connection, for modules that keep their own tables in the same database"""
+        return self._connect()
+    
+    def get_challenge(self, date):
+        """Get a challenge's player pool and metadata, or None if it does not exist"""
+        row = self._connect().execute(
+            'SELECT date, player_pool, pool_version, version, archive, meta FROM challenges WHERE date = ?', (date,)
+        ).fetchone()
+        if row is None:
+            return None
+        player_pool = json.loads(row['player_pool'])
+        if row['archive'] is not None:
+            player_pool = (read_archived(date) or {}).get('player_pool', {})
+        return {
+            'date': row['date'],
+            'player_pool': player_pool,
+            'pool_version': row['pool_version'],
+            'version': row['version'],
+            'meta': json.loads(row['meta']) if row['meta'] else None
+        }
+    
+    def get_version(self, date):
+        """Get a challenge's write version, or None if it does not exist"""
+        row = self._connect().execute('SELECT version FROM challenges WHERE date = ?', (date,)).fetchone()
+        return None if row is None else row['version']
+    
+    def create_challenge(self, date, player_pool, pool_version=None, meta=None):
+        """
+        Store a new challenge. Returns False without changing anything if
+        another worker already created the challenge for this date.
+        """
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO challenges (date, player_pool, pool_version, version, created_at, meta) '
+                'VALUES (?, ?, ?, 0, ?, ?)',
+                (date, json.dumps(player_pool), pool_version, datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                 json.dumps(meta) if meta is not None else None)
+            )
+        return cursor.rowcount == 1
+    
+    def set_meta(self, date, meta):
+        """
+        Store precomputed metadata for a challenge. Returns the new version.
+        Bumps the version like any other write, so workers that cached the
+        challenge before its metadata existed reload it.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute('UPDATE challenges SET meta = ?, version = version + 1 WHERE date = ?', (json.dumps(meta), date))
+            return self._version(conn, date)
+    
+    def save_challenge(self, date, player_pool, pool_version=None):
+        """Create or overwrite a challenge's player pool. Returns the new version."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT INTO challenges (date, player_pool, pool_version, version, created_at) VALUES (?, ?, ?, 0, ?) '
+                'ON CONFLICT(date) DO UPDATE SET player_pool = excluded.player_pool, '
+                'pool_version = excluded.pool_version, version = version + 1, meta = NULL',
+                (date, json.dumps(player_pool), pool_version, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            return self._version(conn, date)
+    
+    def get_submissions(self, date):
+        """Get all submissions for a date as {player_name: submission}, in submission order"""
+        archived = self._archived(date)
+        if archived is not None:
+            return {name: normalize_submission(sub) for name, sub in archived['submissions'].items()}
+        conn = self._connect()
+        # Each distinct lineup is parsed once and shared by every submission that uses it
+        lineups = {
+            row['lineup_id']: tuple(json.loads(row['player_ids']))
+            for row in conn.execute('SELECT lineup_id, player_ids FROM lineups WHERE date = ?', (date,))
+        }
+        rows = conn.execute(
+            'SELECT player_name, data, lineup_id FROM submissions WHERE date = ? ORDER BY rowid', (date,)
+        ).fetchall()
+        submissions = {}
+        for row in rows:
+            submission = json.loads(row['data'])
+            submission['lineup'] = lineups.get(row['lineup_id'], ())
+            submissions[row['player_name']] = submission
+        return submissions
+    
+    def get_submission(self, date, player_name):
+        """Get one player's submission for a date, or None"""
+        archived = self._archived(date)
+        if archived is not None:
+            submission = archived['submissions'].get(player_name)
+            return None if submission is None else normalize_submission(submission)
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT data, lineup_id FROM submissions WHERE date = ? AND player_name = ?', (date, player_name)
+        ).fetchone()
+        if row is None:
+            return None
+        submission = json.loads(row['data'])
+        submission['lineup'] = self._lineup(conn, date, row['lineup_id'])
+        return submission
+    
+    def save_submission(self, date, player_name, submission):
+        """
+        Insert or replace one player's submission and bump the challenge
+        version, in a single transaction. Returns the new version.
+        The team may be given as 'lineup' (player ids) or as 'players' dicts;
+        either way only the lineup reference is stored.
+        Raises ValueError if the day has been finalized.
+        """
+        record = submission.get('record') or {}
+        conn = self._connect()
+        with conn:
+            # Take the write lock before reading, so two workers saving the same
+            # player cannot both see no previous entry and both count it
+            conn.execute('BEGIN IMMEDIATE')
+            finalized = conn.execute('SELECT finalized_at FROM challenges WHERE date = ?', (date,)).fetchone()
+            if finalized is not None and finalized['finalized_at'] is not None:
+                raise ValueError(f"Challenge for {date} is finalized")
+            previous = conn.execute(
+                'SELECT wins, lineup_id FROM submissions WHERE date = ? AND player_name = ?', (date, player_name)
+            ).fetchone()
+            if previous is not None:
+                self._count_wins(conn, date, wins_bucket({'wins': previous['wins']}), -1)
+                self._count_picks(conn, date, self._lineup(conn, date, previous['lineup_id']), -1)
+            lineup_id, data, lineup = self._prepare_submission(conn, date, submission)
+            self._count_wins(conn, date, wins_bucket(record), 1)
+            self._count_picks(conn, date, lineup, 1)
+            conn.execute(
+                'INSERT INTO submissions (date, player_name, wins, losses, data, timestamp, lineup_id) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(date, player_name) DO UPDATE SET wins = excluded.wins, losses = excluded.losses, '
+                'data = excluded.data, timestamp = excluded.timestamp, lineup_id = excluded.lineup_id',
+                (date, player_name, record.get('wins'), record.get('losses'),
+                 data, submission.get('timestamp'), lineup_id)
+            )
+            conn.execute(
+                'UPDATE challenges SET version = version + 1, entries = entries + ? WHERE date = ?',
+                (1 if previous is None else 0, date)
+            )
+            self._refresh_top_record(conn, date)
+            return self._version(conn, date)
+    
+    def _count_wins(self, conn, date, wins, delta):
+        if wins is None:
+            return
+        conn.execute(
+            'INSERT INTO wins_histogram (date, wins, count) VALUES (?, ?, ?) '
+            'ON CONFLICT(date, wins) DO UPDATE SET count = count + excluded.count',
+            (date, wins, delta)
+        )
+    
+    def _rebuild_histogram(self, conn, date=None):
+        """Recount the wins histogram from the submissions table, for one date or all of them"""
+        date_filter, params = ('AND date = ?', (date,)) if date is not None else ('', ())
+        conn.execute(f'DELETE FROM wins_histogram WHERE 1 {date_filter}', params)
+        conn.execute(
+            'INSERT INTO wins_histogram (date, wins, count) '
+            'SELECT date, MAX(0, MIN(wins, ?)) AS bucket, COUNT(*) FROM submissions '
+            f'WHERE wins IS NOT NULL {date_filter} GROUP BY date, bucket',
+            (SEASON_GAMES,) + params
+        )
+    
+    def _count_picks(self, conn, date, lineup, delta):
+        """Adjust the counts of a lineup's players (5 rows) and co-picked pairs (10 rows)"""
+        keys = [str(key) for key in lineup]
+        conn.executemany(
+            'INSERT INTO pick_counts (date, player, count) VALUES (?, ?, ?) '
+            'ON CONFLICT(date, player) DO UPDATE SET count = count + excluded.count',
+            [(date, key, delta) for key in keys]
+        )
+        conn.executemany(
+            'INSERT INTO pair_counts (date, player_a, player_b, count) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(date, player_a, player_b) DO UPDATE SET count = count + excluded.count',
+            [(date, a, b, delta) for i, a in enumerate(keys) for b in keys[i + 1:]]
+        )
+    
+    def _rebuild_pick_counts(self, conn, date=None):
+        """Recount pick and pair counts from the submissions table, for one date or all of them"""
+        date_filter, params = ('WHERE date = ?', (date,)) if date is not None else ('', ())
+        conn.execute(f'DELETE FROM pick_counts {date_filter}', params)
+        conn.execute(f'DELETE FROM pair_counts {date_filter}', params)
+        for row in conn.execute(f'SELECT date, lineup_id FROM submissions {date_filter}', params).fetchall():
+            self._count_picks(conn, row['date'], self._lineup(conn, row['date'], row['lineup_id']), 1)
+    
+    def get_pick_counts(self, date, pairs=True):
+        """
+        How many submissions picked each player, and optionally each pair of
+        players, for a date: ({player: count}, [(player_a, player_b, count)]).
+        Players are keyed by id (or name for lineups without ids).
+        """
+        conn = self._connect()
+        picks = {
+            row['player']: row['count']
+            for row in conn.execute('SELECT player, count FROM pick_counts WHERE date = ? AND count > 0', (date,))
+        }
+        pair_rows = []
+        if pairs:
+            pair_rows = [
+                (row['player_a'], row['player_b'], row['count'])
+                for row in conn.execute(
+                    'SELECT player_a, player_b, count FROM pair_counts WHERE date = ? AND count > 0 '
+                    'ORDER BY count DESC', (date,)
+                )
+            ]
+        return picks, pair_rows
+    
+    def get_entry_count(self, date):
+        row = self._connect().execute('SELECT entries FROM challenges WHERE date = ?', (date,)).fetchone()
+        return None if row is None else row['entries']
+    
+    def get_wins_histogram(self, date):
+        """Number of submissions with each wins total (index = wins) for a date"""
+        counts = empty_histogram()
+        rows = self._connect().execute(
+            'SELECT wins, count FROM wins_histogram WHERE date = ?', (date,)
+        ).fetchall()
+        for row in rows:
+            counts[row['wins']] = row['count']
+        return counts
+    
+    def _version(self, conn, date):
+        row = conn.execute('SELECT version FROM challenges WHERE date = ?', (date,)).fetchone()
+        return None if row is None else row['version']
+    
+    def list_dates(self):
+        """Get all challenge dates, newest first"""
+        rows = self._connect().execute('SELECT date FROM challenges ORDER BY date DESC').fetchall()
+        return [row['date'] for row in rows]
+    
+    def get_manifest(self):
+        """Every challenge date with its entry count and best record, newest first"""
+        rows = self._connect().execute(
+            'SELECT date, entries, top_wins, top_losses, archive, finalized_at FROM challenges ORDER BY date DESC'
+        ).fetchall()
+        return [
+            {
+                'date': row['date'],
+                'entries': row['entries'],
+                'top_record': None if row['top_wins'] is None else
+                    {'wins': row['top_wins'], 'losses': row['top_losses']},
+                'archived': row['archive'] is not None,
+                'finalized': row['finalized_at'] is not None
+            }
+            for row in rows
+        ]
+    
+    def is_finalized(self, date):
+        row = self._connect().execute('SELECT finalized_at FROM challenges WHERE date = ?', (date,)).fetchone()
+        return row is not None and row['finalized_at'] is not None
+    
+    def list_unfinalized_dates(self, before):
+        """Dates earlier than `before` that have not been finalized yet, oldest first"""
+        rows = self._connect().execute(
+            'SELECT date FROM challenges WHERE date < ? AND finalized_at IS NULL ORDER BY date', (before,)
+        ).fetchall()
+        return [row['date'] for row in rows]
+    
+    def mark_finalized(self, date):
+        """Make a day read-only; later save_submission calls for it raise ValueError"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'UPDATE challenges SET finalized_at = ? WHERE date = ?',
+                (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), date)
+            )
+    
+    def list_unarchived_dates(self, before):
+        """Dates earlier than `before` whose data is still in the database, oldest first"""
+        rows = self._connect().execute(
+            'SELECT date FROM challenges WHERE date < ? AND archive IS NULL ORDER BY date', (before,)
+        ).fetchall()
+        return [row['date'] for row in rows]
+    
+    def mark_archived(self, date, month):
+        """
+        Drop a day's pool and submissions from the database once they are in
+        the month's archive. The manifest row and histogram stay.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM submissions WHERE date = ?', (date,))
+            conn.execute('DELETE FROM lineups WHERE date = ?', (date,))
+            conn.execute("UPDATE challenges SET player_pool = '{}', archive = ? WHERE date = ?", (month, date))
+    
+    def import_challenge(self, data, replace=False):
+        """
+        Import a challenge in the legacy JSON file format, submissions included.
+        Returns False if the date already exists and replace is not set.
+        """
+        date = data['date']
+        if self.get_version(date) is not None and not replace:
+            return False
+        
+        submissions = data.get('submissions', {})
+        if isinstance(submissions, list):
+            submissions = {sub['player_name']: sub for sub in submissions}
+        
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM submissions WHERE date = ?', (date,))
+            conn.execute('DELETE FROM lineups WHERE date = ?', (date,))
+            conn.execute('DELETE FROM challenges WHERE date = ?', (date,))
+            conn.execute(
+                'INSERT INTO challenges (date, player_pool, pool_version, version, created_at) VALUES (?, ?, ?, 0, ?)',
+                (date, json.dumps(data.get('player_pool', {})), data.get('pool_version'),
+                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            for player_name, sub in submissions.items():
+                lineup_id, sub_data = self._prepare_submission(conn, date, sub)[:2]
+                record = sub.get('record') or {}
+                conn.execute(
+                    'INSERT INTO submissions (date, player_name, wins, losses, data, timestamp, lineup_id) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (date, player_name, record.get('wins'), record.get('losses'),
+                     sub_data, sub.get('timestamp'), lineup_id)
+                )
+            self._rebuild_histogram(conn, date)
+            self._rebuild_pick_counts(conn, date)
+            self._refresh_summary(conn, date)
+        return True
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Get this process's ChallengeStore"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ChallengeStore()
+    return _store
@@ -7,6 +7,26 @@ files_to_copy = [
     'team_simulator.py',
     'player_pool.py',
     'player_pool.json',
+    'player_pool.bin',
+    'pool_binary.py',
+    'pool_snapshots.py',
+    'pool_sampling.py',
+    'player_identity.py',
+    'player_similarity.py',
+    'challenge_store.py',
+    'migrate_challenges.py',
+    'submission_log.py',
+    'leaderboard_index.py',
+    'score_distribution.py',
+    'challenge_archive.py',
+    'challenge_scheduler.py',
+    'team_scoring.py',
+    'challenge_seed.py',
+    'singleflight.py',
+    'leaderboard_snapshots.py',
+    'standings.py',
+    'lineups.py',
+    'rescoring.py',
     'models.py',
     'app.py',
     'wsgi.py',
@@ -98,32 +98,29 @@ class NBADataFetcher:
         
         return wins, total_games
 
-    def get_top_scorers(self, season='2024-25', limit=150):
-        try:
-            # Get league leaders for points
+    def get_league_snapshot(self, season='2024-25', stat_category='PTS', per_mode='PerGame'):
+        """
+        Get the cached league-wide LeagueLeaders snapshot for a season and stat category.
+        Only the first call for a given key hits the API.
+        """
+        key = (season, stat_category, per_mode)
+        snapshot = _league_snapshots.get(key)
+        if snapshot is None:
+            self.logger.info(f"Fetching LeagueLeaders ({stat_category}, {per_mode}) for {season}")
             leaders = LeagueLeaders(
                 season=season,
-                stat_category_abbreviation='PTS',
-                per_mode48='PerGame',
+                stat_category_abbreviation=stat_category,
+                per_mode48=per_mode,
                 league_id='00'
             )
-            
-            # Get the data as a DataFrame
-            df = leaders.league_leaders.get_data_frame()
-            
-            # Sort by points in descending order and get top players
-            top_scorers = df.sort_values('PTS', ascending=False).head(limit)
-            
-            # Convert to list of player dictionaries
-            players = []
-            for _, row in top_scorers.iterrows():
-                players.append({
-                    'id': row['PLAYER_ID'],
-                    'name': row['PLAYER'],
-                    'team': row['TEAM'],
-                    'points': row['PTS']
-                })
-            
+            snapshot = LeagueLeadersSnapshot(leaders.league_leaders.get_data_frame(), season, stat_category)
+            _league_snapshots[key] = snapshot
+        return snapshot
+
+    def get_top_scorers(self, season='2024-25', limit=150):
+        try:
+            snapshot = self.get_league_snapshot(season, 'PTS')
+            players = snapshot.top('PTS', limit, value_key='points')
             self.logger.info(f"Found {len(players)} top scorers for {season}")
             return players
             
@@ -133,33 +130,9 @@ class NBADataFetcher:
 
     def get_bottom_scorers(self, season='2024-25', limit=75):
         try:
-            # Get league leaders for points
-            leaders = LeagueLeaders(
-                season=season,
-                stat_category_abbreviation='PTS',
-                per_mode48='PerGame',
-                league_id='00'
-            )
-            
-            # Get the data as a DataFrame
-            df = leaders.league_leaders.get_data_frame()
-            
             # Filter out players with very few games played (e.g., less than 20 games)
-            df = df[df['GP'] >= 20]
-            
-            # Sort by points in ascending order and get bottom players
-            bottom_scorers = df.sort_values('PTS', ascending=True).head(limit)
-            
-            # Convert to list of player dictionaries
-            players = []
-            for _, row in bottom_scorers.iterrows():
-                players.append({
-                    'id': int(row['PLAYER_ID']),  # Convert to int to ensure consistent type
-                    'name': row['PLAYER'],
-                    'team': row['TEAM'],
-                    'points': row['PTS']
-                })
-            
+            snapshot = self.get_league_snapshot(season, 'PTS')
+            players = snapshot.bottom('PTS', limit, min_games=20, value_key='points')
             self.logger.info(f"Found {len(players)} bottom scorers for {season}")
             return players
             
@@ -167,6 +140,93 @@ class NBADataFetcher:
             self.logger.error(f"Error fetching bottom scorers: {str(e)}")
             return []
 
+
+# LeagueLeaders snapshots shared by every fetcher, keyed by (season, stat category, per mode)
+_league_snapshots = {}
+
+
+class LeagueLeadersSnapshot:
+    """
+    League-wide LeagueLeaders frame with a precomputed descending order for every
+    numeric stat, so top-N, bottom-N, rank and percentile queries are array slices.
+    """
+    def __init__(self, df, season, stat_category):
+        self.season = season
+        self.stat_category = stat_category
+        self.df = df.reset_index(drop=True)
+        self.player_ids = self.df['PLAYER_ID'].to_numpy(dtype=np.int64)
+        self.names = self.df['PLAYER'].to_numpy()
+        self.teams = self.df['TEAM'].to_numpy()
+        self.games_played = self.df['GP'].to_numpy(dtype=float)
+        self.row_by_id = {player_id: row for row, player_id in enumerate(self.player_ids.tolist())}
+        
+        # For each stat: row indices sorted best-first (NaNs dropped) and each row's position in it
+        self.orders = {}
+        self.positions = {}
+        for stat in self.df.select_dtypes(include='number').columns:
+            if stat == 'PLAYER_ID':
+                continue
+            values = self.df[stat].to_numpy(dtype=float)
+            valid = np.flatnonzero(~np.isnan(values))
+            order = valid[np.argsort(-values[valid], kind='stable')]
+            positions = np.full(len(values), -1, dtype=np.int64)
+            positions[order] = np.arange(len(order))
+            self.orders[stat] = order
+            self.positions[stat] = positions
+    
+    def _order(self, stat, min_games=0):
+        order = self.orders[stat]
+        if min_games:
+            order = order[self.games_played[order] >= min_games]
+        return order
+    
+    def _records(self, rows, stat, value_key=None):
+        values = self.df[stat].to_numpy()
+        key = value_key or stat
+        return [
+            {
+                'id': int(self.player_ids[row]),
+                'name': self.names[row],
+                'team': self.teams[row],
+                key: values[row]
+            }
+            for row in rows
+        ]
+    
+    def top(self, stat, n, min_games=0, value_key=None):
+        """Best n players for a stat"""
+        return self._records(self._order(stat, min_games)[:n], stat, value_key)
+    
+    def bottom(self, stat, n, min_games=0, value_key=None):
+        """Worst n players for a stat, worst first"""
+        order = self._order(stat, min_games)
+        return self._records(order[::-1][:n], stat, value_key)
+    
+    def rank(self, player_id, stat):
+        """1-based rank of a player for a stat, or None if unranked"""
+        row = self.row_by_id.get(int(player_id))
+        if row is None:
+            return None
+        position = self.positions[stat][row]
+        return int(position) + 1 if position >= 0 else None
+    
+    def percentile(self, player_id, stat):
+        """Percentile of a player for a stat (100 is best), or None if unranked"""
+        rank = self.rank(player_id, stat)
+        if rank is None:
+            return None
+        ranked = len(self.orders[stat])
+        if ranked <= 1:
+            return 100.0
+        return 100 - ((rank - 1) / (ranked - 1)) * 100
+    
+    def percentile_band(self, stat, lower, upper, min_games=0, value_key=None):
+        """Players whose percentile for a stat lies between lower and upper (100 is best)"""
+        order = self._order(stat, min_games)
+        start = int(np.floor(len(order) * (100 - upper) / 100))
+        stop = int(np.ceil(len(order) * (100 - lower) / 100))
+        return self._records(order[start:stop], stat, value_key)
+
 def main():
     # Test the data fetcher
     fetcher = NBADataFetcher()
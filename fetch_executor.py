@@ -0,0 +1,51 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class RateLimiter:
+    """
+    Spaces out calls to an external API so that no two start closer
+    together than min_interval seconds, across all threads
+    """
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+        
+    def wait(self):
+        """Block until the caller is allowed to make its next request"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+# Shared limiter for stats.nba.com, which throttles aggressive clients
+nba_api_limiter = RateLimiter(min_interval=1.0)
+
+class RateLimitedExecutor:
+    """
+    Bounded thread pool for independent fetches. Results come back in input
+    order no matter which task finishes first; tasks that hit the network
+    should call a RateLimiter's wait() (e.g. nba_api_limiter) before each
+    request.
+    """
+    def __init__(self, max_workers=3):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        
+    def map(self, fn, items):
+        """Run fn over items concurrently and return the results as a list in input order"""
+        futures = [self._pool.submit(fn, item) for item in items]
+        return [future.result() for future in futures]
+        
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        return False
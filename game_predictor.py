@@ -8,6 +8,17 @@ from sklearn.ensemble import RandomForestClassifier
 import time
 from data_fetcher import NBADataFetcher
 from nba_api.stats.static import players
+from player_identity import PlayerIdentityIndex
+
+# Identity index over every NBA player in nba_api's static list, built on first use
+_nba_identity = None
+
+def get_nba_identity():
+    """Get the shared identity index of all NBA players"""
+    global _nba_identity
+    if _nba_identity is None:
+        _nba_identity = PlayerIdentityIndex((player['id'], player['full_name']) for player in players.get_players())
+    return _nba_identity
 
 class GamePredictor:
     def __init__(self):
@@ -357,9 +368,9 @@ class GamePredictor:
             if stats is not None:
                 home_stats.append(stats)
                 # Get player ID for additional info
-                player_dict = players.find_players_by_full_name(player)
-                if player_dict:
-                    player_info = self.get_player_info(player_dict[0]['id'])
+                player_id = get_nba_identity().resolve(player)
+                if player_id is not None:
+                    player_info = self.get_player_info(player_id)
                     if player_info:
                         home_additional.append(player_info)
                 
@@ -370,9 +381,9 @@ class GamePredictor:
             if stats is not None:
                 away_stats.append(stats)
                 # Get player ID for additional info
-                player_dict = players.find_players_by_full_name(player)
-                if player_dict:
-                    player_info = self.get_player_info(player_dict[0]['id'])
+                player_id = get_nba_identity().resolve(player)
+                if player_id is not None:
+                    player_info = self.get_player_info(player_id)
                     if player_info:
                         away_additional.append(player_info)
                 
@@ -1,33 +1,12 @@
 #!/usr/bin/env python
 """
-Script to generate a new daily challenge for the NBA Team Builder.
-Run this script once per day to create a new challenge.
+Script to generate daily challenges for the NBA Team Builder.
+Creates today's challenge and the following days' (see challenge_scheduler);
+the web app also does this on a background thread, so running it by hand
+is optional.
 """
 
-import os
-import json
-import random
-from datetime import datetime
-from models import DailyChallenge
-
-def main():
-    """Generate a new daily challenge"""
-    print("Generating new daily challenge...")
-    
-    # Create a new challenge for today
-    challenge = DailyChallenge()
-    
-    # The challenge will be automatically generated when initialized
-    # because there's no challenge file for today yet
-    
-    print(f"Challenge for {challenge.date} created successfully!")
-    print(f"Player pool: {sum(len(players) for players in challenge.player_pool.values())} players")
-    
-    # Print the players in each category
-    for cost, players in challenge.player_pool.items():
-        print(f"\n{cost} Players:")
-        for player in players:
-            print(f"  - {player['name']}")
+from challenge_scheduler import main
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,104 @@
+"""
+Order-statistic index over a challenge's submissions.
+
+Submissions are kept as sorted keys (-wins, losses, sequence, player_name)
+plus a player_name -> key map, updated incrementally on every submit.
+Rank, percentile and position (for "entries around me" pages) are binary
+searches and slices rather than a sort of the whole day.
+"""
+from bisect import bisect_left, insort
+
+class LeaderboardIndex:
+    def __init__(self):
+        self._keys = []  # Sorted best-first
+        self._key_by_player = {}
+        self._sequence = 0  # Submission order, breaks ties like the old stable sort did
+    
+    @classmethod
+    def from_submissions(cls, submissions):
+        """Build an index from a {player_name: submission} dict with one sort"""
+        index = cls()
+        for player_name, submission in submissions.items():
+            record = submission.get('record')
+            if not isinstance(record, dict) or 'wins' not in record:
+                continue
+            index._sequence += 1
+            key = cls._score(record) + (index._sequence, player_name)
+            index._keys.append(key)
+            index._key_by_player[player_name] = key
+        index._keys.sort()
+        return index
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def __contains__(self, player_name):
+        return player_name in self._key_by_player
+    
+    @staticmethod
+    def _score(record):
+        return (-record['wins'], record.get('losses', 0))
+    
+    def add(self, player_name, record):
+        """Insert or move a player's entry. Records without wins are not ranked."""
+        self.remove(player_name)
+        if not isinstance(record, dict) or 'wins' not in record:
+            return
+        self._sequence += 1
+        key = self._score(record) + (self._sequence, player_name)
+        insort(self._keys, key)
+        self._key_by_player[player_name] = key
+    
+    def remove(self, player_name):
+        key = self._key_by_player.pop(player_name, None)
+        if key is not None:
+            del self._keys[bisect_left(self._keys, key)]
+    
+    def _better_than(self, key):
+        """Number of entries with a strictly better record"""
+        return bisect_left(self._keys, key[:2])
+    
+    def rank(self, player_name):
+        """1-based rank of a player (tied records share a rank), or None"""
+        key = self._key_by_player.get(player_name)
+        return None if key is None else self._better_than(key) + 1
+    
+    def percentile(self, player_name):
+        """Percentile of a player's entry (100 is best), or None"""
+        key = self._key_by_player.get(player_name)
+        if key is None:
+            return None
+        return self._percentile(self._better_than(key), len(self._keys))
+    
+    def percentile_of(self, player_name, record):
+        """
+        Percentile a player's entry would have with this record, as if it
+        replaced their current entry. The index is not changed.
+        """
+        if not isinstance(record, dict) or 'wins' not in record:
+            return None
+        score = self._score(record)
+        better = bisect_left(self._keys, score)
+        total = len(self._keys) + 1
+        current = self._key_by_player.get(player_name)
+        if current is not None:
+            total -= 1
+            if current[:2] < score:
+                better -= 1
+        return self._percentile(better, total)
+    
+    @staticmethod
+    def _percentile(better, total):
+        if total <= 1:
+            return 100  # If there's only one submission, it's the best
+        return round(100 - (better / (total - 1)) * 100, 1)
+    
+    def position(self, player_name):
+        """0-based position of a player's entry in leaderboard order, or None"""
+        key = self._key_by_player.get(player_name)
+        return None if key is None else bisect_left(self._keys, key)
+    
+    def page(self, offset=0, limit=None):
+        """Player names in leaderboard order, from offset"""
+        stop = None if limit is None else offset + limit
+        return [key[3] for key in self._keys[offset:stop]]
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+Frozen leaderboards for finished days.
+
+Once a day is over, finalize() ranks its submissions one last time and
+writes data/leaderboards/<date>.json: final ranks and percentiles, the
+day's score summary and a little of each lineup. It then marks the day
+read-only in the challenge store. The file is the pre-rendered response
+for /api/challenge/<date>/leaderboard, and it is parsed at most once per
+worker (FinalLeaderboard) to serve leaderboard pages for that day without
+loading or sorting submissions. Finalizing a day also folds its results
+into the cross-day standings (see standings.py).
+"""
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from challenge_archive import read_archived
+from leaderboard_index import LeaderboardIndex
+from lineups import hydrate, players_by_key
+from score_distribution import summarize
+from standings import Standings
+
+LEADERBOARD_DIR = 'data/leaderboards'
+FINAL_CACHE_SIZE = 64
+
+_final_cache = OrderedDict()  # date -> (leaderboard file mtime, or None if archived, FinalLeaderboard)
+_final_cache_lock = threading.Lock()
+
+def leaderboard_path(date, leaderboard_dir=LEADERBOARD_DIR):
+    return os.path.join(leaderboard_dir, f'{date}.json')
+
+class FinalLeaderboard:
+    """A finalized day's leaderboard: the raw JSON bytes plus lookups over the parsed entries"""
+    def __init__(self, raw):
+        self.raw = raw
+        data = json.loads(raw)
+        self.date = data['date']
+        self.summary = data['summary']
+        self.entries = data['entries']
+        self.position_by_player = {entry['player_name']: i for i, entry in enumerate(self.entries)}
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __contains__(self, player_name):
+        return player_name in self.position_by_player
+    
+    def page(self, offset=0, limit=None):
+        stop = None if limit is None else offset + limit
+        return self.entries[offset:stop]
+    
+    def position(self, player_name):
+        return self.position_by_player.get(player_name)
+    
+    def rank(self, player_name):
+        position = self.position_by_player.get(player_name)
+        return None if position is None else self.entries[position]['rank']
+    
+    def percentile(self, player_name):
+        position = self.position_by_player.get(player_name)
+        return None if position is None else self.entries[position]['percentile']
+
+def build_final_leaderboard(date, submissions, histogram, player_pool):
+    """The frozen leaderboard document for a day"""
+    index = LeaderboardIndex.from_submissions(submissions)
+    pool_index = players_by_key(player_pool)
+    entries = []
+    for player_name in index.page():
+        submission = submissions[player_name]
+        entries.append({
+            'rank': index.rank(player_name),
+            'player_name': player_name,
+            'record': submission.get('record'),
+            'percentile': index.percentile(player_name),
+            'players': hydrate(submission.get('lineup', ()), pool_index, stats=False)
+        })
+    return {
+        'date': date,
+        'finalized_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'summary': summarize(histogram),
+        'entries': entries
+    }
+
+def finalize(date, store=None, leaderboard_dir=LEADERBOARD_DIR):
+    """Write a day's frozen leaderboard and mark the day read-only. Returns the number of entries."""
+    if store is None:
+        from challenge_store import get_store
+        store = get_store()
+    
+    version = store.get_version(date)
+    if version is None:
+        raise ValueError(f"No challenge for {date}")
+    entries = store.get_entry_count(date)
+    document = _write_final_leaderboard(date, store, leaderboard_dir)
+    
+    # The snapshot exists before the day is marked read-only, so a finalized day always has one.
+    # save_submission checks finalized_at under the write lock, so once mark_finalized commits no
+    # more submissions land; one that landed in between is picked up by writing it once more.
+    store.mark_finalized(date)
+    if store.get_version(date) != version or store.get_entry_count(date) != entries:
+        document = _write_final_leaderboard(date, store, leaderboard_dir)
+    Standings(store).record_day(date, document['entries'])
+    return len(document['entries'])
+
+def _write_final_leaderboard(date, store, leaderboard_dir):
+    document = build_final_leaderboard(
+        date, store.get_submissions(date), store.get_wins_histogram(date), store.get_challenge(date)['player_pool']
+    )
+    os.makedirs(leaderboard_dir, exist_ok=True)
+    path = leaderboard_path(date, leaderboard_dir)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(json.dumps(document, separators=(',', ':')).encode('utf-8'))
+    os.replace(tmp_path, path)
+    with _final_cache_lock:
+        _final_cache.pop(date, None)
+    return document
+
+def finalize_pending(store=None, today=None, leaderboard_dir=LEADERBOARD_DIR):
+    """Finalize every day before today that has not been finalized. Returns the dates finalized."""
+    if store is None:
+        from challenge_store import get_store
+        store = get_store()
+    today = today or datetime.now().strftime('%Y-%m-%d')
+    dates = store.list_unfinalized_dates(before=today)
+    for date in dates:
+        finalize(date, store, leaderboard_dir)
+    return dates
+
+def get_final_leaderboard(date, leaderboard_dir=LEADERBOARD_DIR):
+    """
+    The FinalLeaderboard for a finalized day, or None if the day has not been
+    finalized. Archived days are read back from their monthly archive.
+    """
+    path = leaderboard_path(date, leaderboard_dir)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    # Keyed on the file's mtime so a day re-finalized by another process is read again
+    cached = _final_cache.get(date)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    
+    try:
+        with open(path, 'rb') as f:
+            final = FinalLeaderboard(f.read())
+    except FileNotFoundError:
+        document = (read_archived(date) or {}).get('final_leaderboard')
+        if document is None:
+            return None
+        final = FinalLeaderboard(json.dumps(document, separators=(',', ':')).encode('utf-8'))
+    
+    with _final_cache_lock:
+        _final_cache[date] = (mtime, final)
+        _final_cache.move_to_end(date)
+        while len(_final_cache) > FINAL_CACHE_SIZE:
+            _final_cache.popitem(last=False)
+    return final
+
+def main():
+    parser = argparse.ArgumentParser(description="Freeze the leaderboards of finished days")
+    parser.add_argument('--date', help="finalize this day only (default: every unfinalized day before today)")
+    args = parser.parse_args()
+    
+    if args.date:
+        try:
+            print(f"Finalized {args.date} with {finalize(args.date)} entries")
+        except ValueError as e:
+            print(f"Error: {e}")
+    else:
+        dates = finalize_pending()
+        print(f"Finalized {len(dates)} days")
+
+if __name__ == "__main__":
+    main()
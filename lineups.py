@@ -0,0 +1,74 @@
+"""
+Normalized lineups.
+
+A submission stores its team as a lineup: the sorted tuple of its players'
+ids (a name stands in for a player without an id). Player details and stats
+are not copied into submissions; they are joined from the day's challenge
+pool when a submission is shown. Equal lineups share one tuple in memory
+(LineupInterner) and one row in the store's per-day lineups table.
+"""
+
+def lineup_key(player):
+    """The id of a submitted player dict (or its name if it has none); plain ids and names pass through"""
+    if isinstance(player, dict):
+        return player.get('id', player.get('name'))
+    return player
+
+def lineup_of(players):
+    """Sorted tuple of distinct player keys"""
+    return tuple(sorted({lineup_key(player) for player in players or []} - {None}, key=str))
+
+def normalize_submission(submission):
+    """
+    A copy of a submission with its 'players' (or legacy 'team') list
+    replaced by a 'lineup' tuple; submissions already normalized only get
+    their lineup turned into a tuple.
+    """
+    normalized = {key: value for key, value in submission.items() if key not in ('players', 'team')}
+    if 'lineup' in submission:
+        normalized['lineup'] = tuple(submission['lineup'] or ())
+    else:
+        normalized['lineup'] = lineup_of(submission.get('players') or submission.get('team'))
+    return normalized
+
+class LineupInterner:
+    """Hands out one shared tuple per distinct lineup"""
+    def __init__(self):
+        self._lineups = {}
+    
+    def __len__(self):
+        return len(self._lineups)
+    
+    def intern(self, lineup):
+        lineup = tuple(lineup)
+        return self._lineups.setdefault(lineup, lineup)
+
+def players_by_key(player_pool):
+    """Index a challenge's tiered pool by player id and name, adding each player's cost"""
+    index = {}
+    for tier, players in player_pool.items():
+        for player in players:
+            entry = dict(player, cost=tier)
+            if 'id' in player:
+                index[player['id']] = entry
+            index.setdefault(player.get('name'), entry)
+    return index
+
+def hydrate(lineup, index, stats=True, fallback=None):
+    """
+    Player dicts for a lineup, looked up in a players_by_key index.
+    Keys missing from the index are passed to fallback (e.g. a lookup in
+    the full player pool) if given.
+    """
+    players = []
+    for key in lineup:
+        player = index.get(key)
+        if player is None and fallback is not None:
+            player = fallback(key)
+        if player is None:
+            players.append({'name': key} if isinstance(key, str) else {'id': key})
+        elif stats:
+            players.append(player)
+        else:
+            players.append({field: player[field] for field in ('id', 'name', 'cost', 'image_url') if field in player})
+    return players
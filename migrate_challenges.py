@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+"""
+Import legacy data/challenges/<date>.json files into the SQLite challenge store.
+Dates already in the store are skipped unless --replace is given.
+"""
+import argparse
+import json
+import os
+from challenge_store import get_store
+
+def main():
+    parser = argparse.ArgumentParser(description="Import data/challenges/*.json into the challenge database")
+    parser.add_argument('--source', default='data/challenges', help="directory of legacy challenge files")
+    parser.add_argument('--replace', action='store_true', help="overwrite dates that already exist in the database")
+    args = parser.parse_args()
+    
+    store = get_store()
+    imported = skipped = 0
+    for filename in sorted(os.listdir(args.source)) if os.path.isdir(args.source) else []:
+        if not filename.endswith('.json'):
+            continue
+        with open(os.path.join(args.source, filename), 'r') as f:
+            data = json.load(f)
+        data.setdefault('date', filename[:-len('.json')])
+        
+        if store.import_challenge(data, replace=args.replace):
+            imported += 1
+            print(f"Imported {data['date']} ({len(data.get('submissions', {}))} submissions)")
+        else:
+            skipped += 1
+    
+    print(f"Imported {imported} challenges into {store.path}, skipped {skipped} already present")
+
+if __name__ == "__main__":
+    main()
@@ -1,100 +1,222 @@
+from collections import OrderedDict
 from datetime import datetime
-import json
-import os
+import logging
+import threading
+from challenge_seed import derive_player_pool, get_recent_player_ids
+from challenge_store import get_store
+from leaderboard_index import LeaderboardIndex
+from lineups import LineupInterner, hydrate, normalize_submission, players_by_key
+from player_identity import PlayerIdentityIndex
+from pool_snapshots import load_snapshot
+from score_distribution import summarize
+from singleflight import SingleFlight, file_lock
+
+logger = logging.getLogger(__name__)
+
+# Per-worker cache of loaded challenges: date -> (store version, DailyChallenge)
+CHALLENGE_CACHE_SIZE = 64
+LEADERBOARD_TOP_N = 50  # First page; cached until an entry enters or leaves it or the entry total changes
+LEADERBOARD_PAGE_MAX = 100
+_challenge_cache = OrderedDict()
+_challenge_cache_lock = threading.Lock()
+_challenge_loads = SingleFlight()  # One DailyChallenge load per date at a time in this worker
+
+def get_challenge(date=None, pool=None):
+    """
+    Get the DailyChallenge for a date (today if None), reusing the object
+    already loaded by this worker. Past days are immutable and served
+    straight from the cache; today's and future challenges are revalidated
+    against the store's version counter and reloaded only if another worker
+    wrote to them. Concurrent misses for the same date share one load.
+    
+    The returned object is shared by every request in this worker, so `pool`
+    is only used to generate a missing day; pass the request's pool to the
+    methods that read it (e.g. get_player_submission) instead.
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    date = date or today
+    
+    cached = _challenge_cache.get(date)
+    if cached is not None:
+        signature, challenge = cached
+        if date < today or get_store().get_version(date) == signature:
+            return challenge
+    
+    return _challenge_loads.do(date, lambda: _load_challenge(date, pool))
+
+def _load_challenge(date, pool):
+    challenge = DailyChallenge(date, pool=pool)
+    with _challenge_cache_lock:
+        _challenge_cache[date] = (challenge.version, challenge)
+        _challenge_cache.move_to_end(date)
+        while len(_challenge_cache) > CHALLENGE_CACHE_SIZE:
+            _challenge_cache.popitem(last=False)
+    return challenge
+
+def get_score_distribution(date=None):
+    """
+    Wins distribution (counts, mean, quantiles) for a date's challenge, read
+    from the store's histogram without loading any submissions. None if
+    there is no challenge for that date.
+    """
+    date = date or datetime.now().strftime('%Y-%m-%d')
+    store = get_store()
+    if store.get_version(date) is None:
+        return None
+    distribution = summarize(store.get_wins_histogram(date))
+    distribution['date'] = date
+    return distribution
+
+def get_pick_rates(date=None, pairs=True):
+    """
+    How often each player in a date's pool, and each co-picked pair, was
+    picked: counts and percentages of the day's entries, read from the
+    store's counters. None if there is no challenge for that date.
+    """
+    date = date or datetime.now().strftime('%Y-%m-%d')
+    store = get_store()
+    entries = store.get_entry_count(date)
+    if entries is None:
+        return None
+    
+    def rate(count):
+        return round(count / entries * 100, 1) if entries else 0
+    
+    picks, pair_counts = store.get_pick_counts(date, pairs=pairs)
+    result = {
+        'date': date,
+        'entries': entries,
+        'players': {player: {'count': count, 'rate': rate(count)} for player, count in picks.items()}
+    }
+    if pairs:
+        result['pairs'] = [
+            {'players': [player_a, player_b], 'count': count, 'rate': rate(count)}
+            for player_a, player_b, count in pair_counts
+        ]
+    return result
+
+def get_challenge_manifest():
+    """Every challenge date with its entry count and best record, newest first"""
+    return get_store().get_manifest()
 
 class DailyChallenge:
-    def __init__(self, date=None):
+    def __init__(self, date=None, pool=None):
         self.date = date or datetime.now().strftime('%Y-%m-%d')
+        self.pool = pool  # PoolSnapshot to draw players from; player_pool.json if None
+        self.pool_version = pool.version if pool else None
         self.player_pool = {}
-        self.submissions = {}
+        self.submissions = {}  # player_name -> submission with a 'lineup' of player ids
+        self.lineups = LineupInterner()
+        self._players_by_key = None  # Challenge pool indexed for joining lineups to player details
+        self._identity = None  # Challenge pool indexed for resolving submitted ids and names
+        self.leaderboard = LeaderboardIndex()
+        self.meta = None  # Precomputed by challenge_scheduler; None until it has run for this date
+        self._top_page = None  # Cached first LEADERBOARD_TOP_N leaderboard entries
+        self.version = None  # Store write version this object reflects
+        self.store = get_store()
         self.load_challenge()
     
     def load_challenge(self):
         """Load the challenge for the current date or create a new one if it doesn't exist"""
-        challenge_file = f'data/challenges/{self.date}.json'
+        if self._load_from_store():
+            return
         
-        if os.path.exists(challenge_file):
-            with open(challenge_file, 'r') as f:
-                data = json.load(f)
-                self.player_pool = data.get('player_pool', {})
-                # Ensure submissions is a dictionary
-                submissions = data.get('submissions', {})
-                if isinstance(submissions, list):
-                    # Convert list to dictionary if necessary
-                    self.submissions = {sub['player_name']: sub for sub in submissions}
-                else:
-                    self.submissions = submissions
-                
-                # Debug logging
-                print(f"Loaded challenge for {self.date}")
-                print(f"Player pool structure: {self.player_pool}")
-                print(f"Number of players in each category:")
-                for cost, players in self.player_pool.items():
-                    print(f"{cost}: {len(players)} players")
-                    if players:
-                        print(f"First player in {cost}: {players[0]['name']}")
-        else:
-            # Create a new challenge with random players
-            print(f"Challenge file not found for {self.date}, generating new challenge...")
-            self.generate_new_challenge()
-            # Save the new challenge
-            self.save_challenge()
+        # Only one worker generates a day; the rest wait and then load its result
+        with file_lock(f'challenge-{self.date}'):
+            if self._load_from_store():
+                return
+            
+            logger.info(f"Challenge not found for {self.date}, generating new challenge...")
+            self.generate_new_challenge(save=False)
+            if not self.store.create_challenge(self.date, self.player_pool, self.pool_version):
+                # Created outside the lock (e.g. an import); use theirs
+                self._load_from_store()
+                return
+            self.version = self.store.get_version(self.date)
     
-    def generate_new_challenge(self):
-        """Generate a new challenge with random players from the player pool"""
-        from team_builder import get_random_players
-        
-        # Load the full player pool
+    def _load_from_store(self):
+        """Load player pool and submissions from the store. Returns False if the challenge does not exist."""
+        data = self.store.get_challenge(self.date)
+        if data is None:
+            return False
+        self.player_pool = data['player_pool']
+        self.pool_version = data['pool_version']
+        self.version = data['version']
+        self.meta = data.get('meta')
+        self._players_by_key = None
+        self._identity = None
+        self.submissions = self.store.get_submissions(self.date)
+        for submission in self.submissions.values():
+            submission['lineup'] = self.lineups.intern(submission.get('lineup', ()))
+        self.leaderboard = LeaderboardIndex.from_submissions(self.submissions)
+        self._top_page = None
+        logger.debug(f"Loaded challenge for {self.date} with {len(self.submissions)} submissions")
+        return True
+    
+    def generate_new_challenge(self, save=True):
+        """Derive the day's players from (date, pool version, salt, recent rosters); see challenge_seed"""
         try:
-            with open('player_pool.json', 'r') as f:
-                full_pool = json.load(f)
-                print(f"Loaded full player pool with {sum(len(players) for players in full_pool.values())} players")
+            pool = self.get_pool()
         except FileNotFoundError:
-            print("Error: player_pool.json not found")
+            logger.error("Error: player_pool.json not found")
             self.player_pool = {"$5": [], "$4": [], "$3": [], "$2": [], "$1": []}
             return
         
-        # Select 5 random players from each cost category
-        self.player_pool = {
-            '$5': get_random_players(full_pool, '$5', 5),
-            '$4': get_random_players(full_pool, '$4', 5),
-            '$3': get_random_players(full_pool, '$3', 5),
-            '$2': get_random_players(full_pool, '$2', 5),
-            '$1': get_random_players(full_pool, '$1', 5)
-        }
+        self.pool_version = pool.version
+        self.player_pool = derive_player_pool(pool, self.date, exclude=get_recent_player_ids(self.store, self.date))
+        self._players_by_key = None
+        self._identity = None
         
-        # Debug logging
-        print(f"Generated new challenge for {self.date}")
-        print(f"Player pool structure: {self.player_pool}")
-        print(f"Number of players in each category:")
-        for cost, players in self.player_pool.items():
-            print(f"{cost}: {len(players)} players")
-            if players:
-                print(f"First player in {cost}: {players[0]['name']}")
+        logger.info(f"Generated new challenge for {self.date}: " + ", ".join(
+            f"{cost}: {len(players)} players" for cost, players in self.player_pool.items()
+        ))
         
         # Save the new challenge
-        self.save_challenge()
+        if save:
+            self.save_challenge()
     
     def save_challenge(self):
-        """Save the current challenge to a file"""
-        # Ensure the data directory exists
-        os.makedirs('data/challenges', exist_ok=True)
-        
-        # Create the challenge data
-        challenge_data = {
-            'date': self.date,
-            'player_pool': self.player_pool,
-            'submissions': self.submissions
-        }
-        
-        # Save to file
-        challenge_file = f'data/challenges/{self.date}.json'
+        """Save the challenge's player pool to the store (submissions are saved one at a time)"""
         try:
-            with open(challenge_file, 'w') as f:
-                json.dump(challenge_data, f, indent=2)
-            print(f"Saved challenge to {challenge_file}")
+            self._set_version(self.store.save_challenge(self.date, self.player_pool, self.pool_version))
         except Exception as e:
-            print(f"Error saving challenge: {e}")
+            logger.error(f"Error saving challenge: {e}")
+    
+    def _save_submission(self, player_name, submission):
+        """
+        Store one submission; cost does not depend on how many submissions the day has.
+        The store is written first, so a rejected write (e.g. the day was
+        finalized) leaves this object untouched.
+        """
+        submission = normalize_submission(submission)
+        submission['lineup'] = self.lineups.intern(submission['lineup'])
+        version = self.store.save_submission(self.date, player_name, submission)
+        if self.version is not None and version == self.version + 1:
+            # Otherwise _set_version reloads, and the reload already includes this submission
+            self.submissions[player_name] = submission
+            total = len(self.leaderboard)
+            self.leaderboard.add(player_name, submission.get('record'))
+            if len(self.leaderboard) != total:
+                self._top_page = None  # Every entry's percentile depends on the total
+            else:
+                self._invalidate_top_page(player_name)
+        self._set_version(version)
+        return submission
+    
+    def _set_version(self, version):
+        """
+        Record the store version after one of our own writes. A write bumps
+        the version by exactly one, so any other gap means another worker
+        wrote in between; reload to pick up its changes.
+        """
+        if self.version is None or version != self.version + 1:
+            self._load_from_store()
+            version = self.version
+        self.version = version
+        # Our own write must not make the cached copy look stale
+        cached = _challenge_cache.get(self.date)
+        if cached is not None and cached[1] is self:
+            _challenge_cache[self.date] = (version, self)
     
     def add_submission(self, player_name, team, record):
         """Add a player submission to the challenge"""
@@ -105,105 +227,129 @@ class DailyChallenge:
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
-        self.submissions[player_name] = submission
-        self.save_challenge()
-        
-        return submission
+        return self._save_submission(player_name, submission)
+    
+    def get_leaderboard(self, offset=0, limit=None):
+        """Get the leaderboard for the current challenge, best record first"""
+        entries = []
+        for player_name in self.leaderboard.page(offset, limit):
+            submission = self.submissions[player_name]
+            submission.setdefault('player_name', player_name)
+            entries.append(submission)
+        return entries
+    
+    def get_leaderboard_page(self, offset=0, limit=LEADERBOARD_TOP_N):
+        """
+        One page of leaderboard entries (rank, player_name, record, percentile, players).
+        The first page is cached; every other page costs O(limit log n).
+        """
+        limit = max(1, min(limit, LEADERBOARD_PAGE_MAX))
+        offset = max(0, offset)
+        if offset == 0 and limit <= LEADERBOARD_TOP_N:
+            if self._top_page is None:
+                self._top_page = self._leaderboard_entries(0, LEADERBOARD_TOP_N)
+            return self._top_page[:limit]
+        return self._leaderboard_entries(offset, limit)
     
-    def get_leaderboard(self):
-        """Get the leaderboard for the current challenge"""
-        # Sort submissions by wins (descending)
-        sorted_submissions = sorted(
-            self.submissions.values(), 
-            key=lambda x: (x['record']['wins'], -x['record']['losses']), 
-            reverse=True
-        )
+    def _leaderboard_entries(self, offset, limit):
+        entries = []
+        for player_name in self.leaderboard.page(offset, limit):
+            submission = self.submissions[player_name]
+            entries.append({
+                'rank': self.leaderboard.rank(player_name),
+                'player_name': player_name,
+                'record': submission.get('record'),
+                'percentile': self.leaderboard.percentile(player_name),
+                'players': self.lineup_players(submission.get('lineup', ()), stats=False),
+            })
+        return entries
+    
+    def lineup_players(self, lineup, stats=True, pool=None):
+        """
+        Player dicts for a lineup, joined from this challenge's pool (and the
+        full pool, `pool` or this challenge's own, for anyone not in it)
+        """
+        if self._players_by_key is None:
+            self._players_by_key = players_by_key(self.player_pool)
         
-        return sorted_submissions
+        def find_pool_player(key):
+            try:
+                return (pool or self.get_pool()).find_player(key, fuzzy=False)
+            except FileNotFoundError:
+                return None
+        return hydrate(lineup, self._players_by_key, stats=stats, fallback=find_pool_player)
     
-    def get_player_submission(self, player_name):
-        """Get a player's submission for the current challenge"""
-        if isinstance(self.submissions, dict):
-            return self.submissions.get(player_name)
-        else:
-            # If submissions is a list, find the submission with matching player_name
-            for submission in self.submissions:
-                if submission.get('player_name') == player_name:
-                    return submission
+    def resolve_player(self, query):
+        """Pool id of the player in this challenge with this id or (accent/case-folded) name, or None"""
+        if self._identity is None:
+            self._identity = PlayerIdentityIndex(
+                (player['id'], player.get('name', ''))
+                for players in self.player_pool.values() for player in players if 'id' in player
+            )
+        return self._identity.resolve(query, fuzzy=False)
+    
+    def _invalidate_top_page(self, player_name):
+        """
+        Drop the cached first page only if this entry is, or was, on it; a move
+        that stays below the page leaves its ranks and percentiles unchanged
+        """
+        if self._top_page is None:
+            return
+        position = self.leaderboard.position(player_name)
+        if (position is not None and position < LEADERBOARD_TOP_N) or \
+                any(entry['player_name'] == player_name for entry in self._top_page):
+            self._top_page = None
+    
+    def get_player_submission(self, player_name, pool=None):
+        """Get a player's submission for the current challenge, with player details and stats joined in"""
+        submission = self.submissions.get(player_name)
+        if submission is None:
             return None
+        hydrated = {key: value for key, value in submission.items() if key != 'lineup'}
+        hydrated['lineup'] = list(submission['lineup'])
+        hydrated['players'] = self.lineup_players(submission['lineup'], pool=pool)
+        return hydrated
     
-    def submit_team(self, player_name, players, record):
-        # Get player stats from the player pool
-        player_pool = self.load_player_pool()
-        players_with_stats = []
-        
+    def submit_team(self, player_name, players, record, pool=None):
+        # Resolve each player to a pool id; only the lineup of ids is stored
+        pool = pool or self.get_pool()
+        lineup = []
+        unknown = []
         for player in players:
-            player_found = False
-            for cost, player_list in player_pool.items():
-                for pool_player in player_list:
-                    if pool_player['name'].lower() in player['name'].lower() or player['name'].lower() in pool_player['name'].lower():
-                        player_with_stats = player.copy()
-                        player_with_stats['stats'] = pool_player['stats']
-                        players_with_stats.append(player_with_stats)
-                        player_found = True
-                        break
-                if player_found:
-                    break
+            # Only exact or accent/case-folded matches; a fuzzy guess could pick someone else
+            pool_player = pool.find_player(player.get('id') or player.get('name'), fuzzy=False)
+            if pool_player is None and player.get('id') and player.get('name'):
+                pool_player = pool.find_player(player['name'], fuzzy=False)
+            if pool_player is None:
+                unknown.append(player.get('name') or player.get('id'))
+            else:
+                lineup.append(pool_player['id'])
+        if unknown:
+            raise ValueError(f"Unknown players: {', '.join(str(name) for name in unknown)}")
+        if len(set(lineup)) != len(lineup):
+            raise ValueError("Team must have 5 different players")
         
         # Calculate percentile rank
         percentile = self.calculate_percentile(player_name, record)
         
-        self.submissions[player_name] = {
-            'players': players_with_stats,
+        submission = self._save_submission(player_name, {
+            'player_name': player_name,
+            'lineup': lineup,
             'record': record,
             'percentile': percentile,
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        self.save_challenge()
+        })
         
         return {
-            'players': players_with_stats,
+            'players': self.lineup_players(submission['lineup'], pool=pool),
             'record': record,
             'percentile': percentile
         }
     
     def calculate_percentile(self, player_name, record):
-        """Calculate the percentile rank of a player's submission"""
-        # Get all submissions with records
-        submissions_with_records = [
-            sub for sub in self.submissions.values() 
-            if 'record' in sub and isinstance(sub['record'], dict) and 'wins' in sub['record']
-        ]
-        
-        # Add the current submission if it's not already in the list
-        current_submission = {
-            'player_name': player_name,
-            'record': record
-        }
-        
-        if current_submission not in submissions_with_records:
-            submissions_with_records.append(current_submission)
-        
-        # Sort by wins (descending)
-        sorted_submissions = sorted(
-            submissions_with_records,
-            key=lambda x: (x['record']['wins'], -x['record']['losses']),
-            reverse=True
-        )
-        
-        # Find the rank of the current submission
-        total_submissions = len(sorted_submissions)
-        if total_submissions <= 1:
-            return 100  # If there's only one submission, it's the best
-        
-        # Find the index of the current submission
-        for i, sub in enumerate(sorted_submissions):
-            if sub['player_name'] == player_name:
-                # Calculate percentile (higher is better)
-                percentile = 100 - ((i / (total_submissions - 1)) * 100)
-                return round(percentile, 1)
-        
-        return 0  # Default if not found
+        """Calculate the percentile rank a submission with this record would have"""
+        percentile = self.leaderboard.percentile_of(player_name, record)
+        return 0 if percentile is None else percentile
     
     def get_percentile_message(self, percentile):
         """Get a friendly message based on the percentile rank"""
@@ -218,33 +364,31 @@ class DailyChallenge:
         else:
             return f"You were in the top {percentile}% of players for today's game!"
     
-    def load_player_pool(self):
+    def get_pool(self):
+        """Get the PoolSnapshot this challenge draws from, loading the current one if none was given"""
+        if self.pool is None:
+            self.pool = load_snapshot()
+        return self.pool
+    
+    def load_player_pool(self, missing_ok=True):
         try:
-            with open('player_pool.json', 'r') as f:
-                return json.load(f)
+            return self.get_pool().data
         except FileNotFoundError:
+            if not missing_ok:
+                raise
             return {"$5": [], "$4": [], "$3": [], "$2": [], "$1": []}
     
     def get_available_dates(self):
         """Get a list of all available challenge dates"""
-        challenge_dir = 'data/challenges'
-        if not os.path.exists(challenge_dir):
-            return []
-        
-        dates = []
-        for filename in os.listdir(challenge_dir):
-            if filename.endswith('.json'):
-                date = filename.replace('.json', '')
-                dates.append(date)
-        
-        return sorted(dates, reverse=True)
+        return self.store.list_dates()
     
     def get_challenge_by_date(self, date):
         """Get a challenge by date"""
-        challenge_file = f'data/challenges/{date}.json'
-        if not os.path.exists(challenge_file):
+        data = self.store.get_challenge(date)
+        if data is None:
             return None
-        
-        with open(challenge_file, 'r') as f:
-            data = json.load(f)
-            return data 
\ No newline at end of file
+        data['submissions'] = {
+            player_name: dict(submission, lineup=list(submission['lineup']))
+            for player_name, submission in self.store.get_submissions(date).items()
+        }
+        return data 
\ No newline at end of file
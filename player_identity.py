@@ -0,0 +1,97 @@
+"""
+Shared player identity index: id <-> canonical name, an accent- and
+case-folded exact map, and a character trigram index for fuzzy fallback.
+"Nikola Jokic", "nikola jokić" and "NIKOLA JOKIC" all resolve to the same
+id with one dict lookup; typos fall back to the best trigram match when
+it is both close and clearly better than the runner-up.
+"""
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+FUZZY_MIN_SCORE = 0.75  # Dice coefficient a fuzzy match needs
+FUZZY_MARGIN = 0.1  # ...and how far it must beat the next best player
+
+def fold_name(name):
+    """Fold a player name for matching: strip accents and punctuation, casefold, collapse spaces"""
+    decomposed = unicodedata.normalize('NFKD', str(name))
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    stripped = re.sub(r"['.’]", '', stripped.casefold())
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', stripped).split())
+
+def _trigrams(folded):
+    padded = f'  {folded} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class PlayerIdentityIndex:
+    """Resolve player ids and names (exact, folded or fuzzy) to a single player id"""
+    def __init__(self, players):
+        """
+        Args:
+            players: iterable of (player_id, name) pairs
+        """
+        self.name_by_id = {}
+        self.id_by_name = {}
+        self.id_by_folded = {}
+        self._trigram_count = {}
+        self._ids_by_trigram = defaultdict(list)
+        
+        for player_id, name in players:
+            player_id = int(player_id)
+            folded = fold_name(name)
+            self.name_by_id[player_id] = name
+            self.id_by_name.setdefault(name, player_id)
+            self.id_by_folded.setdefault(folded, player_id)
+            grams = _trigrams(folded)
+            self._trigram_count[player_id] = len(grams)
+            for gram in grams:
+                self._ids_by_trigram[gram].append(player_id)
+    
+    def __len__(self):
+        return len(self.name_by_id)
+    
+    def resolve(self, query, fuzzy=True, min_score=FUZZY_MIN_SCORE):
+        """
+        Get the player id for an id, exact name or folded name in O(1),
+        falling back (if fuzzy) to the closest trigram match scoring at least
+        min_score and FUZZY_MARGIN more than any other player.
+        Returns None if nothing matches.
+        """
+        if isinstance(query, int) or (isinstance(query, str) and query.isdigit()):
+            player_id = int(query)
+            if player_id in self.name_by_id:
+                return player_id
+        
+        player_id = self.id_by_name.get(query)
+        if player_id is not None:
+            return player_id
+        
+        folded = fold_name(query)
+        player_id = self.id_by_folded.get(folded)
+        if player_id is not None or not fuzzy or not folded:
+            return player_id
+        
+        return self._fuzzy_match(folded, min_score)
+    
+    def _fuzzy_match(self, folded, min_score):
+        grams = _trigrams(folded)
+        overlap = Counter()
+        for gram in grams:
+            overlap.update(self._ids_by_trigram.get(gram, ()))
+        
+        best_id, best_score, runner_up = None, 0.0, 0.0
+        for player_id, shared in overlap.items():
+            # Dice coefficient over trigram sets
+            score = 2 * shared / (len(grams) + self._trigram_count[player_id])
+            if score > best_score:
+                best_id, best_score, runner_up = player_id, score, best_score
+            elif score > runner_up:
+                runner_up = score
+        if best_score < min_score or best_score - runner_up < FUZZY_MARGIN:
+            return None
+        return best_id
+    
+    def canonical_name(self, query, fuzzy=True):
+        """Get the canonical pool name for a query, or None if it does not resolve"""
+        player_id = self.resolve(query, fuzzy)
+        return None if player_id is None else self.name_by_id[player_id]
@@ -1,38 +1,40 @@
-from data_fetcher import NBADataFetcher
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import List, Tuple
 import json
-import random
 import logging
-from categorize_players import categorize_players, get_multi_season_stats, convert_to_json_format
-from datetime import datetime
+from pool_binary import load_player_columns, pool_columns
+from pool_sampling import sample_players
+from player_identity import PlayerIdentityIndex
 
 class PlayerPool:
-    def __init__(self):
-        self.data_fetcher = NBADataFetcher()
-        self.players = {}  # Dictionary to store player costs
-        self.player_stats = {}  # Dictionary to store player stats
-        self._load_player_pool()
+    def __init__(self, pool_data=None):
+        self._data_fetcher = None
+        self.table = pd.DataFrame(columns=['id', 'name', 'cost'])  # One row per player, one column per stat
+        self.row_by_name = {}  # Player name -> table row
+        self.row_by_id = {}  # Player id -> table row
+        self.tier_index = {}  # Table rows in each cost tier, built once at load
+        if pool_data is not None:
+            self._set_table(pool_columns(pool_data))
+        else:
+            self._load_player_pool()
+        
+    @property
+    def data_fetcher(self):
+        """
+        NBA API client, created on first use so that loading a pool never needs nba_api
+        """
+        if self._data_fetcher is None:
+            from data_fetcher import NBADataFetcher
+            self._data_fetcher = NBADataFetcher()
+        return self._data_fetcher
         
     def _load_player_pool(self):
         """
         Load the pre-built player pool from JSON file
         """
         try:
-            with open('player_pool.json', 'r') as f:
-                categorized_players = json.load(f)
-                
-            # Convert JSON data to internal format
-            for cost, player_list in categorized_players.items():
-                for player_data in player_list:
-                    player_name = player_data['name']
-                    self.players[player_name] = {
-                        'cost': int(cost[1]),  # Convert "$5" to 5
-                        'stats': player_data['stats']
-                    }
-                    self.player_stats[player_name] = pd.Series(player_data['stats'])
-                    
+            self._set_table(load_player_columns())
             logging.info("Player pool loaded successfully")
             
         except FileNotFoundError:
@@ -46,63 +48,99 @@ class PlayerPool:
         """
         Build the complete NBA player pool and save it to a JSON file
         """
-        print("Building complete NBA player pool...")
-        
-        # Get current season
-        current_year = datetime.now().year
-        current_month = datetime.now().month
-        current_season = f"{current_year-1}-{str(current_year)[2:]}" if current_month < 10 else f"{current_year}-{str(current_year+1)[2:]}"
-        
-        # Get stats for last 3 seasons
-        seasons = [
-            current_season,
-            f"{int(current_season[:4])-1}-{str(int(current_season[:4]))[-2:]}",
-            f"{int(current_season[:4])-2}-{str(int(current_season[:4])-1)[-2:]}"
-        ]
-        
-        # Get and process stats
-        logging.info("Fetching player statistics for the last 3 seasons...")
-        avg_stats = get_multi_season_stats(seasons)
-        logging.info("Categorizing players...")
-        categorized_players = categorize_players(avg_stats)
+        from player_pool_data import build_player_pool
         
-        # Convert to JSON format
-        logging.info("Converting to JSON format...")
-        json_data = convert_to_json_format(categorized_players)
+        print("Building complete NBA player pool...")
         
-        # Save to JSON file
-        with open('player_pool.json', 'w') as f:
-            json.dump(json_data, f, indent=2)
+        json_data = build_player_pool()
         
         print("\nPlayer pool saved to player_pool.json")
         print("Category counts:")
-        for cost, players in categorized_players.items():
-            print(f"${cost}: {len(players)} players")
+        for cost, players in json_data.items():
+            print(f"{cost}: {len(players)} players")
             
         # Load the saved data
         self._load_player_pool()
         
-    def get_random_players(self, cost, count=5):
+    def _set_table(self, columns):
+        """
+        Replace the player table and rebuild its indexes
+        """
+        self.table = pd.DataFrame(columns)
+        self._build_indexes()
+        
+    def _build_indexes(self):
+        """
+        Index table rows by name, id and cost tier so lookups and sampling never scan the pool
+        """
+        self._names = self.table['name'].tolist()
+        self._costs = self.table['cost'].to_numpy(dtype=np.int64)
+        self.stat_columns = [column for column in self.table.columns if column not in ('id', 'name', 'cost')]
+        self._stats = self.table[self.stat_columns].to_numpy(dtype=float)
+        
+        self.row_by_name = {name: row for row, name in enumerate(self._names)}
+        self.row_by_id = {
+            int(player_id): row
+            for row, player_id in enumerate(self.table['id'].tolist())
+            if not pd.isna(player_id)
+        }
+        self.tier_index = {int(cost): np.flatnonzero(self._costs == cost) for cost in np.unique(self._costs)}
+        self.identity = PlayerIdentityIndex(
+            (player_id, self._names[row]) for player_id, row in self.row_by_id.items()
+        )
+        
+    def find_row(self, player):
+        """
+        Get the table row for a player id or name. Exact names are a dict lookup;
+        unaccented, differently cased or misspelled names go through the identity index.
+        """
+        row = self.row_by_name.get(player)
+        if row is None:
+            player_id = self.identity.resolve(player)
+            row = self.row_by_id.get(player_id)
+        return row
+        
+    def add_player(self, player_name, cost, stats, player_id=None):
+        """
+        Add a player (or replace one with the same name)
+        """
+        row = {'id': player_id, 'name': player_name, 'cost': cost, **dict(stats)}
+        table = self.table[self.table['name'] != player_name]
+        self.table = pd.concat([table, pd.DataFrame([row])], ignore_index=True)
+        self._build_indexes()
+        
+    def get_random_players(self, cost, count=5, rng=None, exclude=None):
         """
         Get random players from a specific cost category
+        
+        Args:
+            cost (int): cost tier to sample from
+            count (int): number of players to return
+            rng: random.Random instance for reproducible picks (e.g. random.Random(seed))
+            exclude: set of player names that must not be picked, such as players
+                already on the team
         """
-        players_in_category = [p for p, data in self.players.items() if data['cost'] == cost]
-        if len(players_in_category) < count:
-            print(f"Warning: Only {len(players_in_category)} players available in ${cost} category")
-            return players_in_category
-        return random.sample(players_in_category, count)
+        rows = sample_players(self.tier_index.get(cost, []), count, rng=rng, exclude=exclude, key=lambda row: self._names[row])
+        players = [self._names[row] for row in rows]
+        if len(players) < count:
+            print(f"Warning: Only {len(players)} players available in ${cost} category")
+        return players
         
     def get_player_cost(self, player_name):
         """
         Get the cost of a specific player
         """
-        return self.players.get(player_name, {}).get('cost', 0)
+        row = self.find_row(player_name)
+        return 0 if row is None else int(self._costs[row])
         
     def get_player_stats(self, player_name):
         """
         Get the stats of a specific player
         """
-        return self.player_stats.get(player_name)
+        row = self.find_row(player_name)
+        if row is None:
+            return None
+        return pd.Series(self._stats[row], index=self.stat_columns)
         
     def _calculate_player_cost(self, stats):
         """
@@ -205,6 +243,7 @@ class PlayerPool:
         active_players = self.data_fetcher.get_active_players()
         
         # Fetch stats for each player
+        rows = []
         for player_name in active_players:
             stats = self.data_fetcher.get_player_stats(player_name)
             
@@ -218,11 +257,9 @@ class PlayerPool:
                     cost = self._value_to_cost(value)
                     
                     # Add player to pool
-                    self.players[player_name] = {
-                        'cost': cost,
-                        'stats': stats
-                    }
-                    self.player_stats[player_name] = stats
+                    rows.append({'id': None, 'name': player_name, 'cost': cost, **dict(stats)})
+        
+        self._set_table(pd.DataFrame(rows, columns=['id', 'name', 'cost'] + (list(rows[0].keys())[3:] if rows else [])))
                 
     def _calculate_player_value(self, stats: pd.Series) -> float:
         """
@@ -323,7 +360,7 @@ class PlayerPool:
         """
         Get list of available players with their costs
         """
-        return [(player, self.get_player_cost(player)) for player in self.players.keys()]
+        return list(zip(self._names, self._costs.tolist()))
         
     def validate_team(self, selected_players: List[str], budget: float = 15.0) -> bool:
         """
@@ -383,11 +420,7 @@ def main():
         if stats is not None:
             value = pool._calculate_player_value(stats)
             cost = pool._value_to_cost(value)
-            pool.players[player] = {
-                'cost': cost,
-                'stats': stats
-            }
-            pool.player_stats[player] = stats
+            pool.add_player(player, cost, stats)
     
     # Print players by tier with more detailed stats
     print("\nPlayers by Cost Tier:")
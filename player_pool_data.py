@@ -1,26 +1,25 @@
+import argparse
 import json
 import logging
-from categorize_players import categorize_players, get_multi_season_stats, convert_to_json_format
-from datetime import datetime
+import os
+from categorize_players import categorize_players, get_multi_season_stats, get_recent_seasons, convert_to_json_format, diff_player_pools
+from pool_binary import write_binary_pool, binary_path
+from pool_snapshots import publish_snapshot
 
-def build_player_pool():
-    """Build the player pool with stats and costs"""
+def build_player_pool(output_path='player_pool.json', full_refresh=False, season_count=3):
+    """
+    Build the player pool with stats and costs.
+    Completed seasons come from the on-disk season cache, so only the
+    in-progress season is fetched unless full_refresh is set. A diff against
+    the previous pool is written next to the output file.
+    """
     try:
-        # Get current season
-        current_year = datetime.now().year
-        current_month = datetime.now().month
-        current_season = f"{current_year-1}-{str(current_year)[2:]}" if current_month < 10 else f"{current_year}-{str(current_year+1)[2:]}"
-        
-        # Get stats for last 3 seasons
-        seasons = [
-            current_season,
-            f"{int(current_season[:4])-1}-{str(int(current_season[:4]))[-2:]}",
-            f"{int(current_season[:4])-2}-{str(int(current_season[:4])-1)[-2:]}"
-        ]
+        # Get stats for the most recent seasons
+        seasons = get_recent_seasons(season_count)
         
         # Get and process stats
-        logging.info("Fetching player statistics for the last 3 seasons...")
-        avg_stats = get_multi_season_stats(seasons)
+        logging.info(f"Fetching player statistics for the last {season_count} seasons...")
+        avg_stats = get_multi_season_stats(seasons, use_cache=not full_refresh)
         logging.info("Categorizing players...")
         categorized_players = categorize_players(avg_stats)
         
@@ -28,11 +27,30 @@ def build_player_pool():
         logging.info("Converting to JSON format...")
         json_data = convert_to_json_format(categorized_players)
         
+        # Diff against the pool being replaced
+        old_pool = {}
+        if os.path.exists(output_path):
+            try:
+                with open(output_path, 'r') as f:
+                    old_pool = json.load(f)
+            except json.JSONDecodeError:
+                logging.warning(f"Could not parse previous {output_path}, diffing against an empty pool")
+        diff = diff_player_pools(old_pool, json_data)
+        
         # Save to JSON file
-        with open('player_pool.json', 'w') as f:
+        with open(output_path, 'w') as f:
             json.dump(json_data, f, indent=2)
+        write_binary_pool(json_data, binary_path(output_path))
+        publish_snapshot(json_data)
         
-        logging.info("Player pool built and saved successfully")
+        diff_path = os.path.splitext(output_path)[0] + '_diff.json'
+        with open(diff_path, 'w') as f:
+            json.dump(diff, f, indent=2)
+        
+        logging.info(
+            f"Player pool built and saved successfully: {len(diff['tier_changes'])} tier changes, "
+            f"{len(diff['new_players'])} new players, {len(diff['dropped_players'])} dropped players"
+        )
         return json_data
         
     except Exception as e:
@@ -52,5 +70,15 @@ def convert_weighted_value_to_cost_tier(weighted_value):
     else:                         # $1: Role players
         return 1
 
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild player_pool.json, refetching only the current season")
+    parser.add_argument('--full', action='store_true', help="refetch completed seasons instead of using the season cache")
+    parser.add_argument('--output', default='player_pool.json', help="path of the player pool to write")
+    parser.add_argument('--seasons', type=int, default=3, help="number of seasons to average, current season first")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    build_player_pool(args.output, full_refresh=args.full, season_count=args.seasons)
+
 if __name__ == "__main__":
-    build_player_pool() 
\ No newline at end of file
+    main()
@@ -0,0 +1,75 @@
+"""
+Nearest-neighbour search over standardized player stat vectors, used to
+answer "who plays like X but costs less".
+"""
+import numpy as np
+
+# Stats describing how a player plays; games played is about availability, not style
+SIMILARITY_FIELDS = [
+    'points', 'rebounds', 'assists', 'steals', 'blocks',
+    'fg_pct', 'ft_pct', 'three_pct', 'minutes'
+]
+
+class SimilarityIndex:
+    """Standardized stat vectors for a pool; each query is one vectorized distance computation"""
+    def __init__(self, player_ids, costs, stats):
+        """
+        Args:
+            player_ids: sequence of player ids, one per row
+            costs: integer cost tier of each row
+            stats: (n_players x len(SIMILARITY_FIELDS)) stat matrix
+        """
+        self.player_ids = np.asarray(player_ids, dtype=np.int64)
+        self.costs = np.asarray(costs, dtype=np.int64)
+        stats = np.asarray(stats, dtype=float)
+        
+        # z-score every stat so points do not drown out steals; missing stats sit at the mean
+        mean = np.nanmean(stats, axis=0)
+        std = np.nanstd(stats, axis=0)
+        std[std == 0] = 1.0
+        self.vectors = np.nan_to_num((stats - mean) / std)
+        self.row_by_id = {player_id: row for row, player_id in enumerate(self.player_ids.tolist())}
+    
+    @classmethod
+    def from_pool(cls, player_pool):
+        """Build an index from a tiered pool dict"""
+        players = [(int(tier[1:]), player) for tier, tier_players in player_pool.items() for player in tier_players]
+        return cls(
+            [player['id'] for _, player in players],
+            [cost for cost, _ in players],
+            [[player['stats'].get(field, np.nan) for field in SIMILARITY_FIELDS] for _, player in players]
+        )
+    
+    @classmethod
+    def from_columns(cls, columns):
+        """Build an index from pool columns (see pool_binary.BinaryPlayerPool.columns)"""
+        return cls(columns['id'], columns['cost'], np.column_stack([columns[field] for field in SIMILARITY_FIELDS]))
+    
+    def query(self, player_id, k=5, cost=None, max_cost=None, candidate_ids=None):
+        """
+        Get the k players closest to player_id as (player_id, distance) pairs, nearest first.
+        
+        Args:
+            cost (int): only return players of this cost tier
+            max_cost (int): only return players costing at most this much
+            candidate_ids: only return players whose id is in this collection
+        """
+        row = self.row_by_id.get(int(player_id))
+        if row is None:
+            return []
+        
+        distances = np.sqrt(((self.vectors - self.vectors[row]) ** 2).sum(axis=1))
+        mask = np.ones(len(distances), dtype=bool)
+        mask[row] = False
+        if cost is not None:
+            mask &= self.costs == cost
+        if max_cost is not None:
+            mask &= self.costs <= max_cost
+        if candidate_ids is not None:
+            mask &= np.isin(self.player_ids, np.fromiter(candidate_ids, dtype=np.int64))
+        
+        candidates = np.flatnonzero(mask)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(distances[candidates], k)[:k]]
+        candidates = candidates[np.argsort(distances[candidates], kind='stable')]
+        return [(int(self.player_ids[i]), float(distances[i])) for i in candidates]
@@ -0,0 +1,284 @@
+"""
+Compact binary companion to player_pool.json.
+
+Layout (little endian):
+    header        MAGIC, player count, string table size
+    records       fixed-width structured array, one row per player
+    string table  UTF-8 player names, addressed by (name_offset, name_length)
+
+The file is opened with mmap, so every worker process shares the same
+physical pages and loading costs no parsing. Loading returns a read-only
+BinaryPoolView over the mapped records: tiers are slices of the record
+array (records are written tier by tier), id lookups are a binary search,
+and a player's dict is only built when that player is first read.
+player_pool.json stays the human-readable interchange format and the
+fallback when no fresh binary file exists.
+"""
+import json
+import mmap
+import os
+import struct
+from collections.abc import Mapping, Sequence
+import numpy as np
+
+MAGIC = b'BGMPOOL1'
+HEADER = struct.Struct('<8sII')
+HEADER_SIZE = 32  # header padded so records start 8-byte aligned
+
+TIERS = ['$5', '$4', '$3', '$2', '$1']
+
+STAT_FIELDS = [
+    'games_played', 'points', 'rebounds', 'assists', 'steals',
+    'blocks', 'fg_pct', 'ft_pct', 'three_pct', 'minutes'
+]
+
+RECORD_DTYPE = np.dtype(
+    [('id', '<i8'), ('name_offset', '<u4'), ('name_length', '<u2'), ('tier', 'u1'), ('_pad', 'u1')]
+    + [(field, '<f8') for field in STAT_FIELDS]
+)
+
+# Integer cost of each tier, indexed like TIERS
+TIER_COSTS = np.array([int(tier[1:]) for tier in TIERS], dtype=np.int8)
+
+def binary_path(json_path):
+    """Path of the binary companion for a JSON pool file"""
+    return os.path.splitext(json_path)[0] + '.bin'
+
+def write_binary_pool(player_pool, path):
+    """Write a tiered player pool dict in the binary format"""
+    players = [
+        (TIERS.index(tier), player)
+        for tier in TIERS
+        for player in player_pool.get(tier, [])
+    ]
+    records = np.zeros(len(players), dtype=RECORD_DTYPE)
+    names = bytearray()
+    
+    for row, (tier_idx, player) in enumerate(players):
+        encoded = player['name'].encode('utf-8')
+        records[row]['id'] = int(player['id'])
+        records[row]['name_offset'] = len(names)
+        records[row]['name_length'] = len(encoded)
+        records[row]['tier'] = tier_idx
+        for field in STAT_FIELDS:
+            records[row][field] = player['stats'].get(field, np.nan)
+        names += encoded
+    
+    header = HEADER.pack(MAGIC, len(records), len(names)).ljust(HEADER_SIZE, b'\0')
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(records.tobytes())
+        f.write(names)
+    os.replace(tmp_path, path)
+
+class BinaryPlayerPool:
+    """Read-only, memory-mapped view of a binary player pool file"""
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, count, names_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary player pool")
+        
+        self.records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE, count=count, offset=HEADER_SIZE)
+        self._names_offset = HEADER_SIZE + count * RECORD_DTYPE.itemsize
+        self._names_size = names_size
+        
+        # Records are written tier by tier, so each tier is one contiguous row range
+        bounds = np.searchsorted(self.records['tier'], np.arange(len(TIERS) + 1))
+        self.tier_rows = {tier: (int(bounds[i]), int(bounds[i + 1])) for i, tier in enumerate(TIERS)}
+        self._id_order = None
+        self._players = [None] * count
+        self._view = None
+        
+    def __len__(self):
+        return len(self.records)
+        
+    def name(self, row):
+        """Player name for a record row"""
+        record = self.records[row]
+        start = self._names_offset + int(record['name_offset'])
+        return self._mmap[start:start + int(record['name_length'])].decode('utf-8')
+        
+    def player(self, row):
+        """The player dict for a record row, built on first access"""
+        player = self._players[row]
+        if player is None:
+            record = self.records[row]
+            player = {
+                'id': int(record['id']),
+                'name': self.name(row),
+                'stats': {field: float(record[field]) for field in STAT_FIELDS}
+            }
+            self._players[row] = player
+        return player
+        
+    def row_of(self, player_id):
+        """Record row of a player id, or None"""
+        if self._id_order is None:
+            self._id_order = np.argsort(self.records['id'], kind='stable')
+        ids = self.records['id']
+        position = int(np.searchsorted(ids, player_id, sorter=self._id_order))
+        if position < len(ids) and ids[self._id_order[position]] == player_id:
+            return int(self._id_order[position])
+        return None
+        
+    def view(self):
+        """The pool as a read-only tiered mapping (see BinaryPoolView)"""
+        if self._view is None:
+            self._view = BinaryPoolView(self)
+        return self._view
+        
+    def to_dict(self):
+        """Rebuild the tiered dict format of player_pool.json"""
+        names = self._mmap[self._names_offset:self._names_offset + self._names_size]
+        player_pool = {tier: [] for tier in TIERS}
+        for player_id, name_offset, name_length, tier, _, *stats in self.records.tolist():
+            player_pool[TIERS[tier]].append({
+                'id': player_id,
+                'name': names[name_offset:name_offset + name_length].decode('utf-8'),
+                'stats': dict(zip(STAT_FIELDS, stats))
+            })
+        return player_pool
+        
+    def columns(self):
+        """Pool as columns: id, name, cost and one array per stat field"""
+        names = self._mmap[self._names_offset:self._names_offset + self._names_size]
+        columns = {
+            'id': self.records['id'],
+            'name': [
+                names[offset:offset + length].decode('utf-8')
+                for offset, length in zip(self.records['name_offset'].tolist(), self.records['name_length'].tolist())
+            ],
+            'cost': TIER_COSTS[self.records['tier']]
+        }
+        for field in STAT_FIELDS:
+            columns[field] = self.records[field]
+        return columns
+
+class BinaryTier(Sequence):
+    """One tier of a binary pool: a row range whose player dicts are built as they are read"""
+    def __init__(self, pool, start, stop):
+        self._pool = pool
+        self._start = start
+        self._stop = stop
+        
+    def __len__(self):
+        return self._stop - self._start
+        
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._pool.player(self._start + index)
+
+class BinaryPlayersById(Mapping):
+    """Player id -> player dict, looked up in the mapped id column"""
+    def __init__(self, pool):
+        self._pool = pool
+        
+    def __getitem__(self, player_id):
+        row = self._pool.row_of(player_id) if isinstance(player_id, (int, np.integer)) else None
+        if row is None:
+            raise KeyError(player_id)
+        return self._pool.player(row)
+        
+    def __iter__(self):
+        return iter(self._pool.records['id'].tolist())
+        
+    def __len__(self):
+        return len(self._pool)
+
+class BinaryPoolView(Mapping):
+    """
+    Read-only view of a binary pool in the tiered format of player_pool.json.
+    Use as_dict() where a plain dict is needed (e.g. to serialize the pool).
+    """
+    def __init__(self, pool):
+        self._pool = pool
+        self._tiers = {tier: BinaryTier(pool, start, stop) for tier, (start, stop) in pool.tier_rows.items()}
+        self.players_by_id = BinaryPlayersById(pool)
+        
+    def __getitem__(self, tier):
+        return self._tiers[tier]
+        
+    def __iter__(self):
+        return iter(self._tiers)
+        
+    def __len__(self):
+        return len(self._tiers)
+        
+    def id_names(self):
+        """(id, name) of every player, without building player dicts"""
+        return zip(self._pool.records['id'].tolist(), (self._pool.name(row) for row in range(len(self._pool))))
+        
+    def columns(self):
+        return self._pool.columns()
+        
+    def to_dict(self):
+        return self._pool.to_dict()
+
+def as_dict(player_pool):
+    """A tiered pool as a plain dict, converting a BinaryPoolView"""
+    return player_pool.to_dict() if isinstance(player_pool, BinaryPoolView) else player_pool
+
+def pool_columns(player_pool):
+    """Flatten a tiered pool dict into the same columns as BinaryPlayerPool.columns"""
+    players = [(tier, player) for tier in TIERS for player in player_pool.get(tier, [])]
+    columns = {
+        'id': np.array([player['id'] for _, player in players], dtype=np.int64),
+        'name': [player['name'] for _, player in players],
+        'cost': np.array([int(tier[1:]) for tier, _ in players], dtype=np.int8)
+    }
+    for field in STAT_FIELDS:
+        columns[field] = np.array([player['stats'].get(field, np.nan) for _, player in players], dtype=float)
+    return columns
+
+# Open binary pools, keyed by path, with the mtime they were opened at
+_open_pools = {}
+
+def open_binary_pool(path):
+    """Get a memory-mapped pool, reopening it only if the file has been replaced"""
+    mtime = os.path.getmtime(path)
+    cached = _open_pools.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, BinaryPlayerPool(path))
+        _open_pools[path] = cached
+    return cached[1]
+
+def _fresh_binary_path(json_path):
+    """Binary companion of json_path if it exists and is at least as new, else None"""
+    bin_path = binary_path(json_path)
+    if os.path.exists(bin_path) and (
+        not os.path.exists(json_path) or os.path.getmtime(bin_path) >= os.path.getmtime(json_path)
+    ):
+        return bin_path
+    return None
+
+def load_player_pool(json_path='player_pool.json'):
+    """
+    Load the tiered player pool: a BinaryPoolView over the binary companion
+    when it is at least as new as the JSON file, else the parsed JSON dict.
+    Raises FileNotFoundError if neither exists.
+    """
+    bin_path = _fresh_binary_path(json_path)
+    if bin_path:
+        return open_binary_pool(bin_path).view()
+    
+    with open(json_path, 'r') as f:
+        return json.load(f)
+
+def load_player_columns(json_path='player_pool.json'):
+    """Load the pool as columns, straight from the binary companion when it is fresh"""
+    bin_path = _fresh_binary_path(json_path)
+    if bin_path:
+        return open_binary_pool(bin_path).columns()
+    
+    with open(json_path, 'r') as f:
+        return pool_columns(json.load(f))
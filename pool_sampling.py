@@ -0,0 +1,50 @@
+import random
+
+def sample_players(candidates, count, rng=None, exclude=None, key=None):
+    """
+    Sample `count` distinct entries from an indexable sequence of candidates.
+    
+    Draws random positions and rejects repeats and excluded entries, so the
+    expected cost is O(count) rather than O(len(candidates)) as long as the
+    exclusions are a small part of the tier. If too many draws are rejected it
+    falls back to sampling from the filtered candidates.
+    
+    Args:
+        candidates: indexable sequence to sample from (e.g. one tier's index)
+        count (int): number of entries to return
+        rng: random.Random instance for reproducible draws; the global generator if None
+        exclude: set of keys that must not be picked (e.g. players already on a team)
+        key: maps a candidate to the key checked against `exclude`; the candidate itself if None
+    """
+    rng = rng or random
+    exclude = exclude or ()
+    key = key or (lambda candidate: candidate)
+    n = len(candidates)
+    
+    if n == 0 or count <= 0:
+        return []
+    if count >= n and not exclude:
+        return list(candidates)
+    
+    picked = []
+    seen = set()
+    attempts = 0
+    max_attempts = 4 * count + 16
+    while len(picked) < count and attempts < max_attempts:
+        attempts += 1
+        position = rng.randrange(n)
+        if position in seen:
+            continue
+        seen.add(position)
+        candidate = candidates[position]
+        if key(candidate) not in exclude:
+            picked.append(candidate)
+    
+    if len(picked) < count:
+        # Dense exclusions: sample from the filtered candidates instead
+        available = [candidate for candidate in candidates if key(candidate) not in exclude]
+        if len(available) <= count:
+            return available
+        return rng.sample(available, count)
+    
+    return picked
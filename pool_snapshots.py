@@ -0,0 +1,197 @@
+"""
+Immutable, content-hashed player pool snapshots with hot reload.
+
+A build publishes the pool as data/pool_snapshots/<version>.json (plus its
+binary companion) and then atomically repoints manifest.json at it. Web
+workers hold a PoolReloader that checks the manifest at most once per
+check interval and swaps a single PoolSnapshot reference when it changes,
+so a refreshed pool is picked up without restarting gunicorn. Requests
+grab one snapshot up front and use it throughout, so a request never mixes
+two pool versions.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from player_identity import PlayerIdentityIndex
+from player_similarity import SimilarityIndex
+from pool_binary import BinaryPoolView, as_dict, binary_path, load_player_pool, write_binary_pool
+from singleflight import SingleFlight
+
+SNAPSHOT_DIR = 'data/pool_snapshots'
+MANIFEST_NAME = 'manifest.json'
+
+logger = logging.getLogger(__name__)
+
+# Indexes for a new snapshot are built once, however many requests ask at the same time
+_index_builds = SingleFlight()
+
+def pool_version(player_pool):
+    """Content hash identifying a pool"""
+    canonical = json.dumps(as_dict(player_pool), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+
+def publish_snapshot(player_pool, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Write a pool as an immutable snapshot and make it the current one.
+    Returns the snapshot version.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    player_pool = as_dict(player_pool)
+    version = pool_version(player_pool)
+    snapshot_path = os.path.join(snapshot_dir, f'{version}.json')
+    
+    # Same content means same version, so an existing snapshot is never rewritten
+    if not os.path.exists(snapshot_path):
+        tmp_path = f'{snapshot_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(player_pool, f, indent=2)
+        write_binary_pool(player_pool, binary_path(snapshot_path))
+        os.replace(tmp_path, snapshot_path)
+    
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    tmp_manifest = f'{manifest_path}.tmp'
+    with open(tmp_manifest, 'w') as f:
+        json.dump({
+            'version': version,
+            'published_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }, f, indent=2)
+    os.replace(tmp_manifest, manifest_path)
+    
+    logger.info(f"Published player pool snapshot {version}")
+    return version
+
+class PoolSnapshot:
+    """One immutable version of the player pool, with indexes built on first use"""
+    def __init__(self, version, data):
+        self.version = version
+        self.data = data
+        self._players_by_id = None
+        self._identity = None
+        self._similarity = None
+        
+    @property
+    def players_by_id(self):
+        """Player dicts keyed by player id"""
+        if self._players_by_id is None and isinstance(self.data, BinaryPoolView):
+            self._players_by_id = self.data.players_by_id
+        elif self._players_by_id is None:
+            self._players_by_id = {
+                player['id']: player
+                for players in self.data.values()
+                for player in players
+            }
+        return self._players_by_id
+        
+    @property
+    def identity(self):
+        """PlayerIdentityIndex over this pool"""
+        if self._identity is None:
+            self._identity = _index_builds.do((self.version, 'identity'), lambda: PlayerIdentityIndex(
+                self.data.id_names() if isinstance(self.data, BinaryPoolView)
+                else ((player_id, player['name']) for player_id, player in self.players_by_id.items())
+            ))
+        return self._identity
+        
+    @property
+    def similarity(self):
+        """SimilarityIndex over this pool's stat vectors"""
+        if self._similarity is None:
+            self._similarity = _index_builds.do(
+                (self.version, 'similarity'),
+                lambda: SimilarityIndex.from_columns(self.data.columns()) if isinstance(self.data, BinaryPoolView)
+                else SimilarityIndex.from_pool(self.data)
+            )
+        return self._similarity
+        
+    def find_player(self, query, fuzzy=True):
+        """
+        Get the pool player dict for an id or (possibly unaccented or, if
+        fuzzy, misspelled) name
+        """
+        player_id = self.identity.resolve(query, fuzzy)
+        return None if player_id is None else self.players_by_id[player_id]
+
+def load_snapshot(snapshot_dir=SNAPSHOT_DIR, json_path='player_pool.json'):
+    """
+    Load the snapshot named by the manifest, or player_pool.json when
+    no snapshot has been published yet
+    """
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            version = json.load(f)['version']
+        return PoolSnapshot(version, load_player_pool(os.path.join(snapshot_dir, f'{version}.json')))
+    
+    data = load_player_pool(json_path)
+    return PoolSnapshot(pool_version(data), data)
+
+def load_snapshot_version(version, snapshot_dir=SNAPSHOT_DIR, json_path='player_pool.json'):
+    """Load a specific pool version, or None if it is no longer available"""
+    path = os.path.join(snapshot_dir, f'{version}.json')
+    if os.path.exists(path):
+        return PoolSnapshot(version, load_player_pool(path))
+    if os.path.exists(json_path):
+        data = load_player_pool(json_path)
+        if pool_version(data) == version:
+            return PoolSnapshot(version, data)
+    return None
+
+class PoolReloader:
+    """
+    Holds the current PoolSnapshot for a worker and swaps it when a new one
+    is published. The manifest (or player_pool.json) is stat'ed at most once
+    per check_interval seconds.
+    """
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR, json_path='player_pool.json', check_interval=30):
+        self.snapshot_dir = snapshot_dir
+        self.json_path = json_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._source_mtime = self._get_source_mtime()
+        self._snapshot = load_snapshot(snapshot_dir, json_path)
+        self._last_check = time.monotonic()
+        
+    def _get_source_mtime(self):
+        manifest_path = os.path.join(self.snapshot_dir, MANIFEST_NAME)
+        for path in (manifest_path, binary_path(self.json_path), self.json_path):
+            if os.path.exists(path):
+                return (path, os.path.getmtime(path))
+        return None
+        
+    def current(self):
+        """Get the current snapshot, reloading it first if a new one was published"""
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self._check_for_update()
+        return self._snapshot
+        
+    def _check_for_update(self):
+        # Only one thread checks; the others keep serving the current snapshot
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._last_check = time.monotonic()
+            source_mtime = self._get_source_mtime()
+            if source_mtime == self._source_mtime:
+                return
+            snapshot = load_snapshot(self.snapshot_dir, self.json_path)
+            self._source_mtime = source_mtime
+            if snapshot.version != self._snapshot.version:
+                logger.info(f"Player pool changed from {self._snapshot.version} to {snapshot.version}")
+                self._snapshot = snapshot
+        except Exception as e:
+            logger.error(f"Error reloading player pool: {str(e)}")
+        finally:
+            self._lock.release()
+
+def main():
+    """Publish the current player_pool.json as a snapshot"""
+    logging.basicConfig(level=logging.INFO)
+    version = publish_snapshot(load_player_pool())
+    print(f"Published player pool snapshot {version}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+"""
+Retroactive re-scoring of past challenges.
+
+Records are scored once, when a team is submitted, and stay that way when
+player_pool.json is refreshed or the scoring model changes. A rescore run
+scores every stored lineup again with team_scoring and saves the results
+as a new numbered scoring version, next to (never over) the original
+records:
+
+- Each day is scored in one pass: its distinct lineups become an index
+  array into the day's player scores, and every lineup's expected wins
+  come out of one matrix operation. Ranks and percentiles are computed
+  over the whole day at once.
+- Days are independent, so they are scored in parallel worker processes;
+  the parent writes each day's results in a single transaction.
+- rescored_lineups keeps each distinct lineup's re-scored wins per day and
+  rescored_results each entry's position, rank and percentile, so a
+  leaderboard "as of" any scoring version is a range read (see
+  RescoredLeaderboard). scoring_versions records how each version was made.
+
+Lineups are scored with the stats frozen in each day's challenge pool, or
+with the current pool's stats (--pool current) after a stats refresh.
+"""
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+from lineups import hydrate, players_by_key
+from score_distribution import SEASON_GAMES
+from team_scoring import SCORING_VERSION, expected_wins, player_scores, stat_matrix
+
+MAX_RESCORE_WORKERS = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scoring_versions (
+    version INTEGER PRIMARY KEY,
+    scoring_model INTEGER NOT NULL,
+    pool TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    days INTEGER NOT NULL DEFAULT 0,
+    entries INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS rescored_lineups (
+    version INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    lineup_no INTEGER NOT NULL,
+    player_ids TEXT NOT NULL,
+    wins INTEGER,
+    PRIMARY KEY (version, date, lineup_no)
+);
+CREATE TABLE IF NOT EXISTS rescored_results (
+    version INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    player_name TEXT NOT NULL,
+    lineup_no INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    percentile REAL NOT NULL,
+    PRIMARY KEY (version, date, position)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS rescored_results_by_player ON rescored_results (version, date, player_name);
+"""
+
+_schema_ready = set()  # Database paths whose rescoring tables exist
+_schema_lock = threading.Lock()
+
+def _ensure_schema(store):
+    """Create the rescoring tables once per database, not on every request"""
+    if store.path in _schema_ready:
+        return
+    with _schema_lock:
+        if store.path not in _schema_ready:
+            with store.connection() as conn:
+                conn.executescript(SCHEMA)
+            _schema_ready.add(store.path)
+
+def score_day(player_pool, submissions, stats_by_id=None):
+    """
+    Re-score one day's submissions.
+    
+    Args:
+        player_pool: the day's tiered challenge pool
+        submissions: {player_name: submission} with 'lineup' tuples, in submission order
+        stats_by_id: optional {player id: stats} that replaces the pool's stats
+    
+    Returns:
+        (lineups, entries): the distinct lineups with their wins (None for a
+        lineup with no known players), and the ranked entries in
+        leaderboard order as (player_name, lineup number, rank, percentile)
+    """
+    players = [player for tier_players in player_pool.values() for player in tier_players]
+    if stats_by_id:
+        players = [
+            dict(player, stats=stats_by_id[player['id']]) if player.get('id') in stats_by_id else player
+            for player in players
+        ]
+    row_by_key = {}
+    for row, player in enumerate(players):
+        if 'id' in player:
+            row_by_key[player['id']] = row
+        row_by_key.setdefault(player.get('name'), row)
+    
+    lineup_numbers = {}
+    entry_lineups = [
+        lineup_numbers.setdefault(tuple(submission.get('lineup') or ()), len(lineup_numbers))
+        for submission in submissions.values()
+    ]
+    lineups = list(lineup_numbers)
+    
+    # One padded index array for every distinct lineup; the padding row scores NaN so
+    # players missing from the pool drop out of a lineup's mean
+    width = max((len(lineup) for lineup in lineups), default=0)
+    rows = np.full((len(lineups), max(width, 1)), len(players), dtype=np.int64)
+    for number, lineup in enumerate(lineups):
+        known = [row_by_key[key] for key in lineup if key in row_by_key]
+        rows[number, :len(known)] = known
+    lineup_scores = np.append(player_scores(stat_matrix(players)), np.nan)[rows]
+    scored = ~np.isnan(lineup_scores).all(axis=1)
+    wins = np.zeros(len(lineups), dtype=np.int64)
+    if scored.any():
+        wins[scored] = expected_wins(np.nanmean(lineup_scores[scored], axis=1))
+    
+    # Rank the entries whose lineup could be scored; ties share a rank and keep submission order
+    names = [name for name, number in zip(submissions, entry_lineups) if scored[number]]
+    numbers = np.array([number for number in entry_lineups if scored[number]], dtype=np.int64)
+    entry_wins = wins[numbers]
+    order = np.argsort(-entry_wins, kind='stable')
+    ranks = np.searchsorted(-entry_wins[order], -entry_wins, side='left') + 1
+    total = len(names)
+    percentiles = np.full(total, 100.0) if total <= 1 else np.round(100 - (ranks - 1) / (total - 1) * 100, 1)
+    
+    lineup_results = [
+        (list(lineup), int(wins[number]) if scored[number] else None) for number, lineup in enumerate(lineups)
+    ]
+    entries = [
+        (names[i], int(numbers[i]), int(ranks[i]), float(percentiles[i])) for i in order.tolist()
+    ]
+    return lineup_results, entries
+
+_worker_store = None
+_worker_stats = None
+
+def _init_worker(store_path, stats_by_id):
+    # Each worker opens the database itself; connections must not cross a fork
+    global _worker_store, _worker_stats
+    from challenge_store import ChallengeStore
+    _worker_store = ChallengeStore(store_path)
+    _worker_stats = stats_by_id
+
+def _rescore_date(date):
+    """Worker task: read and score one day"""
+    challenge = _worker_store.get_challenge(date)
+    if challenge is None:
+        return date, [], []
+    lineup_results, entries = score_day(challenge['player_pool'], _worker_store.get_submissions(date), _worker_stats)
+    return date, lineup_results, entries
+
+def _write_day(conn, version, date, lineup_results, entries):
+    conn.execute('DELETE FROM rescored_lineups WHERE version = ? AND date = ?', (version, date))
+    conn.execute('DELETE FROM rescored_results WHERE version = ? AND date = ?', (version, date))
+    conn.executemany(
+        'INSERT INTO rescored_lineups (version, date, lineup_no, player_ids, wins) VALUES (?, ?, ?, ?, ?)',
+        [(version, date, number, json.dumps(lineup), wins) for number, (lineup, wins) in enumerate(lineup_results)]
+    )
+    conn.executemany(
+        'INSERT INTO rescored_results (version, date, position, player_name, lineup_no, rank, percentile) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        [(version, date, position) + entry for position, entry in enumerate(entries)]
+    )
+
+def rescore(store=None, version=None, dates=None, use_current_pool=False, workers=MAX_RESCORE_WORKERS):
+    """
+    Re-score every stored day (or just `dates`) under a scoring version.
+    A new version number is allocated unless one is given, in which case
+    its results for these days are replaced. Returns (version, days, entries).
+    """
+    if store is None:
+        from challenge_store import get_store
+        store = get_store()
+    _ensure_schema(store)
+    dates = sorted(dates or store.list_dates())
+    
+    stats_by_id = None
+    pool = 'day'
+    if use_current_pool:
+        from pool_snapshots import load_snapshot
+        snapshot = load_snapshot()
+        stats_by_id = {player_id: player['stats'] for player_id, player in snapshot.players_by_id.items()}
+        pool = snapshot.version
+    
+    conn = store.connection()
+    with conn:
+        if version is None:
+            version = conn.execute('SELECT COALESCE(MAX(version), 0) + 1 AS next FROM scoring_versions').fetchone()['next']
+        conn.execute(
+            'INSERT INTO scoring_versions (version, scoring_model, pool, created_at) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(version) DO UPDATE SET scoring_model = excluded.scoring_model, pool = excluded.pool, '
+            'created_at = excluded.created_at',
+            (version, SCORING_VERSION, pool, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        )
+    
+    workers = max(1, min(workers, len(dates)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(store.path, stats_by_id)) as executor:
+        for date, lineup_results, entries in executor.map(_rescore_date, dates):
+            with conn:
+                _write_day(conn, version, date, lineup_results, entries)
+    
+    with conn:
+        totals = conn.execute(
+            'SELECT COUNT(DISTINCT date) AS days, COUNT(*) AS entries FROM rescored_results WHERE version = ?', (version,)
+        ).fetchone()
+        conn.execute(
+            'UPDATE scoring_versions SET days = ?, entries = ? WHERE version = ?',
+            (totals['days'], totals['entries'], version)
+        )
+    return version, len(dates), totals['entries']
+
+def list_scoring_versions(store=None):
+    """Every stored scoring version, oldest first"""
+    if store is None:
+        from challenge_store import get_store
+        store = get_store()
+    _ensure_schema(store)
+    rows = store.connection().execute('SELECT * FROM scoring_versions ORDER BY version').fetchall()
+    return [dict(row) for row in rows]
+
+class RescoredLeaderboard:
+    """A day's leaderboard under a stored scoring version, read page by page from the store"""
+    def __init__(self, store, version, date):
+        self.store = store
+        self.version = version
+        self.date = date
+        self._conn = store.connection()
+        self._total = self._conn.execute(
+            'SELECT COUNT(*) AS total FROM rescored_results WHERE version = ? AND date = ?', (version, date)
+        ).fetchone()['total']
+        self._pool_index = None
+    
+    def __len__(self):
+        return self._total
+    
+    def __contains__(self, player_name):
+        return self._entry(player_name) is not None
+    
+    def _entry(self, player_name):
+        return self._conn.execute(
+            'SELECT position, rank, percentile FROM rescored_results WHERE version = ? AND date = ? AND player_name = ?',
+            (self.version, self.date, player_name)
+        ).fetchone()
+    
+    def position(self, player_name):
+        row = self._entry(player_name)
+        return None if row is None else row['position']
+    
+    def rank(self, player_name):
+        row = self._entry(player_name)
+        return None if row is None else row['rank']
+    
+    def percentile(self, player_name):
+        row = self._entry(player_name)
+        return None if row is None else row['percentile']
+    
+    def page(self, offset=0, limit=None):
+        rows = self._conn.execute(
+            'SELECT r.rank, r.player_name, r.percentile, l.player_ids, l.wins FROM rescored_results r '
+            'JOIN rescored_lineups l ON l.version = r.version AND l.date = r.date AND l.lineup_no = r.lineup_no '
+            'WHERE r.version = ? AND r.date = ? ORDER BY r.position LIMIT ? OFFSET ?',
+            (self.version, self.date, -1 if limit is None else limit, offset)
+        ).fetchall()
+        if rows and self._pool_index is None:
+            self._pool_index = players_by_key((self.store.get_challenge(self.date) or {}).get('player_pool', {}))
+        return [
+            {
+                'rank': row['rank'],
+                'player_name': row['player_name'],
+                'record': {'wins': row['wins'], 'losses': SEASON_GAMES - row['wins']},
+                'percentile': row['percentile'],
+                'players': hydrate(json.loads(row['player_ids']), self._pool_index, stats=False)
+            }
+            for row in rows
+        ]
+
+def get_rescored_leaderboard(date, version, store=None):
+    """A day's RescoredLeaderboard, or None if the version does not exist or never scored that day"""
+    if store is None:
+        from challenge_store import get_store
+        store = get_store()
+    _ensure_schema(store)
+    if store.connection().execute('SELECT 1 FROM scoring_versions WHERE version = ?', (version,)).fetchone() is None:
+        return None
+    board = RescoredLeaderboard(store, version, date)
+    if not len(board) and store.get_challenge(date) is None:
+        return None
+    return board
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score past challenges under a new scoring version")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run = subparsers.add_parser('run', help="Score stored lineups and save the results as a scoring version")
+    run.add_argument('--version', type=int, help="Replace this version's results instead of adding a new version")
+    run.add_argument('--pool', choices=['day', 'current'], default='day',
+                     help="Score with each day's frozen pool stats or the current pool's stats")
+    run.add_argument('--workers', type=int, default=min(MAX_RESCORE_WORKERS, os.cpu_count() or 1))
+    run.add_argument('dates', nargs='*', help="Only these dates (default: every stored day)")
+    subparsers.add_parser('list', help="List stored scoring versions")
+    args = parser.parse_args()
+    
+    if args.command == 'list':
+        for info in list_scoring_versions():
+            print(f"v{info['version']}: model {info['scoring_model']}, pool {info['pool']}, "
+                  f"{info['days']} days, {info['entries']} entries ({info['created_at']})")
+        return
+    version, days, entries = rescore(
+        version=args.version, dates=args.dates, use_current_pool=args.pool == 'current', workers=args.workers
+    )
+    print(f"Scoring version {version}: re-scored {entries} entries across {days} days")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Summaries of a challenge's wins histogram.
+
+The histogram itself is kept by the challenge store (one counter per wins
+value, adjusted on every submit), so summarizing a day costs O(83) no
+matter how many people played.
+"""
+SEASON_GAMES = 82
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+def empty_histogram():
+    """Counts for 0..SEASON_GAMES wins"""
+    return [0] * (SEASON_GAMES + 1)
+
+def wins_bucket(record):
+    """Histogram bucket for a submission record, or None if it has no wins"""
+    if not isinstance(record, dict) or record.get('wins') is None:
+        return None
+    return max(0, min(int(record['wins']), SEASON_GAMES))
+
+def quantile(counts, q, total=None):
+    """Nearest-rank quantile of a histogram, or None if it is empty"""
+    total = sum(counts) if total is None else total
+    if total == 0:
+        return None
+    target = max(1, -(-q * total // 1))  # ceil(q * total)
+    running = 0
+    for wins, count in enumerate(counts):
+        running += count
+        if running >= target:
+            return wins
+    return len(counts) - 1
+
+def summarize(counts, quantiles=QUANTILES):
+    """Total, mean, standard deviation and quantiles of a wins histogram"""
+    total = sum(counts)
+    if total == 0:
+        return {'total': 0, 'counts': counts, 'mean': None, 'stdev': None,
+                'quantiles': {f"p{round(q * 100)}": None for q in quantiles}}
+    
+    mean = sum(wins * count for wins, count in enumerate(counts)) / total
+    variance = sum(count * (wins - mean) ** 2 for wins, count in enumerate(counts)) / total
+    return {
+        'total': total,
+        'counts': counts,
+        'mean': round(mean, 2),
+        'stdev': round(variance ** 0.5, 2),
+        'quantiles': {f"p{round(q * 100)}": quantile(counts, q, total) for q in quantiles}
+    }
@@ -0,0 +1,72 @@
+"""
+Request coalescing for expensive cache misses.
+
+SingleFlight runs one computation per key at a time within a process:
+callers that arrive while it is in flight wait for it and share its
+result (or its exception) instead of repeating the work. file_lock
+extends the same idea across gunicorn workers with an flock on
+data/locks/<name>.lock, for work such as creating a day's challenge that
+must happen once no matter which worker gets there first.
+"""
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+
+LOCK_DIR = 'data/locks'
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+    
+    def do(self, key, fn):
+        """Run fn() for key, or wait for the call already running for key and return its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+@contextmanager
+def file_lock(name, blocking=True, lock_dir=LOCK_DIR):
+    """
+    Hold an exclusive lock shared by every process on this machine.
+    Yields True once the lock is held, or False straight away if
+    blocking is False and another process holds it.
+    """
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f'{name}.lock'), 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
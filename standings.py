@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+"""
+All-time and rolling player standings across daily challenges.
+
+Standings are updated once per day, when leaderboard_snapshots finalizes
+it, from that day's final ranks:
+
+- daily_results keeps each player's final rank, percentile and wins per day.
+- standings keeps running aggregates per (window, player) for the 7d, 30d
+  and all-time windows. Adding a day is one upsert per entry; the days that
+  slide out of a rolling window are subtracted the same way.
+- streaks keeps consecutive days played and consecutive top-10 finishes,
+  counted over all time.
+- standings_top stores each window's leaderboard as ready-made JSON.
+
+Looking up one player is a primary-key read, and a top list is a single
+row. All tables live in the challenge store's SQLite database.
+"""
+import argparse
+import json
+import threading
+from datetime import datetime, timedelta
+
+WINDOWS = {'7d': 7, '30d': 30, 'all': None}
+TOP_N = 100
+TOP_RANK = 10  # Finishing at or above this rank extends a top-10 streak
+MIN_DAYS = 3  # Days a player needs in a window to appear in its top list
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_results (
+    date TEXT NOT NULL,
+    player_name TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    percentile REAL NOT NULL,
+    wins INTEGER NOT NULL,
+    PRIMARY KEY (date, player_name)
+);
+CREATE INDEX IF NOT EXISTS daily_results_by_player ON daily_results (player_name, date);
+CREATE TABLE IF NOT EXISTS standings (
+    period TEXT NOT NULL,
+    player_name TEXT NOT NULL,
+    days_played INTEGER NOT NULL,
+    percentile_sum REAL NOT NULL,
+    best_percentile REAL NOT NULL,
+    total_wins INTEGER NOT NULL,
+    PRIMARY KEY (period, player_name)
+);
+CREATE TABLE IF NOT EXISTS streaks (
+    player_name TEXT PRIMARY KEY,
+    last_played TEXT NOT NULL,
+    current_streak INTEGER NOT NULL,
+    best_streak INTEGER NOT NULL,
+    last_top10 TEXT,
+    current_top10_streak INTEGER NOT NULL DEFAULT 0,
+    best_top10_streak INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS standings_top (
+    period TEXT PRIMARY KEY,
+    as_of TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS standings_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def _shift(date, days):
+    return (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=days)).strftime('%Y-%m-%d')
+
+class Standings:
+    """Cross-day aggregates kept in a ChallengeStore's database"""
+    def __init__(self, store):
+        self.store = store
+        with store.connection() as conn:
+            conn.executescript(SCHEMA)
+    
+    def _conn(self):
+        return self.store.connection()
+    
+    def last_date(self):
+        """The most recent day included in the standings, or None"""
+        row = self._conn().execute("SELECT value FROM standings_state WHERE key = 'last_date'").fetchone()
+        return None if row is None else row['value']
+    
+    def record_day(self, date, entries):
+        """
+        Add a finalized day's entries (dicts with player_name, rank, percentile
+        and record). Days are expected in date order; a day at or before the
+        last one recorded triggers a full rebuild from daily_results.
+        """
+        conn = self._conn()
+        last = self.last_date()
+        with conn:
+            conn.execute('DELETE FROM daily_results WHERE date = ?', (date,))
+            conn.executemany(
+                'INSERT INTO daily_results (date, player_name, rank, percentile, wins) VALUES (?, ?, ?, ?, ?)',
+                [
+                    (date, entry['player_name'], entry['rank'], entry['percentile'] or 0,
+                     (entry.get('record') or {}).get('wins') or 0)
+                    for entry in entries
+                ]
+            )
+            if last is not None and date <= last:
+                self._rebuild(conn)
+            else:
+                self._apply_day(conn, date, last)
+                self._write_top_lists(conn, date)
+    
+    def _day_results(self, conn, date):
+        return conn.execute(
+            'SELECT player_name, rank, percentile, wins FROM daily_results WHERE date = ?', (date,)
+        ).fetchall()
+    
+    def _apply_day(self, conn, date, previous):
+        results = self._day_results(conn, date)
+        for window, days in WINDOWS.items():
+            conn.executemany(
+                'INSERT INTO standings (period, player_name, days_played, percentile_sum, best_percentile, total_wins) '
+                'VALUES (?, ?, 1, ?, ?, ?) ON CONFLICT(period, player_name) DO UPDATE SET '
+                'days_played = days_played + 1, percentile_sum = percentile_sum + excluded.percentile_sum, '
+                'best_percentile = MAX(best_percentile, excluded.best_percentile), '
+                'total_wins = total_wins + excluded.total_wins',
+                [(window, row['player_name'], row['percentile'], row['percentile'], row['wins']) for row in results]
+            )
+            if days is not None and previous is not None:
+                self._expire(conn, window, days, previous, date)
+        
+        yesterday = _shift(date, -1)
+        for row in results:
+            streak = conn.execute('SELECT * FROM streaks WHERE player_name = ?', (row['player_name'],)).fetchone()
+            played = streak['current_streak'] + 1 if streak and streak['last_played'] == yesterday else 1
+            top10 = row['rank'] <= TOP_RANK
+            top10_streak = 0
+            if top10:
+                top10_streak = streak['current_top10_streak'] + 1 if streak and streak['last_top10'] == yesterday else 1
+            conn.execute(
+                'INSERT INTO streaks (player_name, last_played, current_streak, best_streak, last_top10, '
+                'current_top10_streak, best_top10_streak) VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(player_name) DO UPDATE SET last_played = excluded.last_played, '
+                'current_streak = excluded.current_streak, best_streak = MAX(best_streak, excluded.best_streak), '
+                'last_top10 = COALESCE(excluded.last_top10, last_top10), '
+                'current_top10_streak = CASE WHEN excluded.last_top10 IS NULL THEN current_top10_streak '
+                'ELSE excluded.current_top10_streak END, '
+                'best_top10_streak = MAX(best_top10_streak, excluded.best_top10_streak)',
+                (row['player_name'], date, played, played, date if top10 else None, top10_streak, top10_streak)
+            )
+        conn.execute(
+            "INSERT INTO standings_state (key, value) VALUES ('last_date', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (date,)
+        )
+    
+    def _expire(self, conn, window, days, previous, date):
+        """Subtract the days that moved out of a rolling window when it advanced from previous to date"""
+        leaving = conn.execute(
+            'SELECT player_name, percentile, wins FROM daily_results WHERE date > ? AND date <= ?',
+            (_shift(previous, -days), _shift(date, -days))
+        ).fetchall()
+        start = _shift(date, -days)
+        for row in leaving:
+            conn.execute(
+                'UPDATE standings SET days_played = days_played - 1, percentile_sum = percentile_sum - ?, '
+                'total_wins = total_wins - ? WHERE period = ? AND player_name = ?',
+                (row['percentile'], row['wins'], window, row['player_name'])
+            )
+            # The best percentile cannot be subtracted; recount it from the days still in the window
+            best = conn.execute(
+                'SELECT MAX(percentile) AS best FROM daily_results WHERE player_name = ? AND date > ? AND date <= ?',
+                (row['player_name'], start, date)
+            ).fetchone()['best']
+            if best is None:
+                conn.execute('DELETE FROM standings WHERE period = ? AND player_name = ?', (window, row['player_name']))
+            else:
+                conn.execute(
+                    'UPDATE standings SET best_percentile = ? WHERE period = ? AND player_name = ?',
+                    (best, window, row['player_name'])
+                )
+    
+    def _rebuild(self, conn):
+        """Replay every recorded day in order"""
+        for table in ('standings', 'streaks', 'standings_state'):
+            conn.execute(f'DELETE FROM {table}')
+        dates = [row['date'] for row in conn.execute('SELECT DISTINCT date FROM daily_results ORDER BY date')]
+        previous = None
+        for date in dates:
+            self._apply_day(conn, date, previous)
+            previous = date
+        if previous is not None:
+            self._write_top_lists(conn, previous)
+    
+    def _write_top_lists(self, conn, date):
+        for window in WINDOWS:
+            rows = conn.execute(
+                'SELECT player_name, days_played, percentile_sum, best_percentile, total_wins FROM standings '
+                'WHERE period = ? AND days_played >= ? '
+                'ORDER BY percentile_sum / days_played DESC, days_played DESC LIMIT ?',
+                (window, MIN_DAYS, TOP_N)
+            ).fetchall()
+            top = {'mean_percentile': [self._row_summary(row) for row in rows]}
+            if window == 'all':
+                streak_rows = conn.execute(
+                    'SELECT player_name, best_top10_streak FROM streaks WHERE best_top10_streak > 0 '
+                    'ORDER BY best_top10_streak DESC LIMIT ?', (TOP_N,)
+                ).fetchall()
+                top['top10_streak'] = [
+                    {'player_name': row['player_name'], 'best_top10_streak': row['best_top10_streak']}
+                    for row in streak_rows
+                ]
+            conn.execute(
+                'INSERT INTO standings_top (period, as_of, data) VALUES (?, ?, ?) '
+                'ON CONFLICT(period) DO UPDATE SET as_of = excluded.as_of, data = excluded.data',
+                (window, date, json.dumps(top, separators=(',', ':')))
+            )
+    
+    @staticmethod
+    def _row_summary(row):
+        return {
+            'player_name': row['player_name'],
+            'days_played': row['days_played'],
+            'mean_percentile': round(row['percentile_sum'] / row['days_played'], 1),
+            'best_percentile': row['best_percentile'],
+            'total_wins': row['total_wins']
+        }
+    
+    def get_top(self, window):
+        """The precomputed top lists for a window, as {'as_of', 'mean_percentile', ...}; None before any day is recorded"""
+        row = self._conn().execute('SELECT as_of, data FROM standings_top WHERE period = ?', (window,)).fetchone()
+        if row is None:
+            return None
+        top = json.loads(row['data'])
+        top['as_of'] = row['as_of']
+        return top
+    
+    def get_player(self, window, player_name):
+        """One player's standing in a window plus their streaks, or None if they have no days in it"""
+        conn = self._conn()
+        row = conn.execute(
+            'SELECT player_name, days_played, percentile_sum, best_percentile, total_wins FROM standings '
+            'WHERE period = ? AND player_name = ?', (window, player_name)
+        ).fetchone()
+        if row is None:
+            return None
+        standing = self._row_summary(row)
+        
+        streak = conn.execute('SELECT * FROM streaks WHERE player_name = ?', (player_name,)).fetchone()
+        last = self.last_date()
+        if streak is not None:
+            # A streak is only current if it reaches the latest finalized day
+            standing['current_streak'] = streak['current_streak'] if streak['last_played'] == last else 0
+            standing['best_streak'] = streak['best_streak']
+            standing['current_top10_streak'] = streak['current_top10_streak'] if streak['last_top10'] == last else 0
+            standing['best_top10_streak'] = streak['best_top10_streak']
+        return standing
+
+_standings = None
+_standings_lock = threading.Lock()
+
+def get_standings():
+    """Get this process's Standings over the shared challenge store"""
+    global _standings
+    if _standings is None:
+        with _standings_lock:
+            if _standings is None:
+                from challenge_store import get_store
+                _standings = Standings(get_store())
+    return _standings
+
+def rebuild_from_snapshots(standings=None):
+    """Recreate the standings from every finalized day's leaderboard snapshot. Returns the number of days."""
+    from leaderboard_snapshots import get_final_leaderboard
+    standings = standings or get_standings()
+    dates = [
+        day['date'] for day in standings.store.get_manifest()
+        if day['finalized'] and get_final_leaderboard(day['date']) is not None
+    ]
+    conn = standings.store.connection()
+    with conn:
+        for table in ('daily_results', 'standings', 'streaks', 'standings_top', 'standings_state'):
+            conn.execute(f'DELETE FROM {table}')
+    for date in sorted(dates):
+        standings.record_day(date, get_final_leaderboard(date).entries)
+    return len(dates)
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain cross-day player standings")
+    parser.add_argument('command', choices=['rebuild'])
+    parser.parse_args()
+    print(f"Rebuilt standings from {rebuild_from_snapshots()} finalized days")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Append-only log for /api/submit_team submissions.
+
+Each submission is one JSON line appended to data/submissions/<date>.ndjson
+with a single O_APPEND write, so submitting costs the same no matter how
+many entries the day already has, and concurrent workers never overwrite
+each other. Compaction indexes the log incrementally: it parses only the
+lines written since the last run and appends one [player_name, offset,
+length] line per submission to <date>.idx, which is itself append-only.
+The end of the last indexed line is the log offset the index covers.
+Reads look a player's lines up in the index, seek straight to them, and
+parse only the unindexed tail of the log. Once a day is archived its log
+is read back from the monthly archive instead (see challenge_archive.py).
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from challenge_archive import read_archived
+from singleflight import file_lock
+
+LOG_DIR = 'data/submissions'
+INDEX_TAIL_BYTES = 4096  # Enough of the index file's end to hold its last line
+
+logger = logging.getLogger(__name__)
+
+_index_cache = {}  # (log_dir, date) -> (index file bytes read, {player_name: [(offset, length)]}, covered offset)
+_index_cache_lock = threading.Lock()
+
+def log_path(date, log_dir=LOG_DIR):
+    return os.path.join(log_dir, f'{date}.ndjson')
+
+def index_path(date, log_dir=LOG_DIR):
+    return os.path.join(log_dir, f'{date}.idx')
+
+def append_submission(submission, date=None, log_dir=LOG_DIR):
+    """Append one submission to the day's log"""
+    date = date or datetime.now().strftime('%Y-%m-%d')
+    os.makedirs(log_dir, exist_ok=True)
+    _append(log_path(date, log_dir), (json.dumps(submission, separators=(',', ':')) + '\n').encode('utf-8'))
+
+def _append(path, data):
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+def _read_lines(path, offset=0):
+    """
+    Complete lines written after offset, as (offset, line) pairs, and the
+    offset just past the last complete line. A line still being written has
+    no newline yet and is left for the next read.
+    """
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+    
+    end = data.rfind(b'\n') + 1
+    lines = []
+    position = offset
+    for line in data[:end].split(b'\n')[:-1]:
+        lines.append((position, line))
+        position += len(line) + 1
+    return lines, offset + end
+
+def _parse(line, date):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        logger.error(f"Skipping corrupt submission log line for {date}")
+        return None
+
+def _covered_offset(date, log_dir=LOG_DIR):
+    """Log offset covered by the day's index, read from the index's last line"""
+    path = index_path(date, log_dir)
+    try:
+        with open(path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            start = max(0, size - INDEX_TAIL_BYTES)
+            f.seek(start)
+            tail = f.read()
+    except FileNotFoundError:
+        return 0
+    
+    complete = tail[:tail.rfind(b'\n')]
+    if not complete:
+        return 0
+    newline = complete.rfind(b'\n')
+    if newline < 0 and start > 0:
+        # One very long line; fall back to reading the whole index
+        return _load_index(date, log_dir)[1]
+    _, offset, length = json.loads(complete[newline + 1:])
+    return offset + length + 1
+
+def _load_index(date, log_dir=LOG_DIR):
+    """
+    The day's index as ({player_name: [(offset, length)]}, covered offset).
+    Cached per worker; only index lines appended since the last call are parsed.
+    """
+    key = (log_dir, date)
+    with _index_cache_lock:
+        read, index, covered = _index_cache.get(key, (0, {}, 0))
+        lines, read = _read_lines(index_path(date, log_dir), read)
+        if lines:
+            index = {name: list(positions) for name, positions in index.items()}
+            for _, line in lines:
+                name, offset, length = json.loads(line)
+                if name is not None:
+                    index.setdefault(name, []).append((offset, length))
+                covered = offset + length + 1
+            _index_cache[key] = (read, index, covered)
+        return index, covered
+
+def read_submissions(date=None, log_dir=LOG_DIR):
+    """Get all of a day's submissions in submission order"""
+    date = date or datetime.now().strftime('%Y-%m-%d')
+    if not os.path.exists(log_path(date, log_dir)):
+        return _archived_log(date)
+    lines, _ = _read_lines(log_path(date, log_dir))
+    submissions = (_parse(line, date) for _, line in lines if line.strip())
+    return [submission for submission in submissions if submission is not None]
+
+def get_player_submissions(player_name, date=None, log_dir=LOG_DIR):
+    """Get one player's submissions for a day: indexed lines by seek, then the unindexed tail"""
+    date = date or datetime.now().strftime('%Y-%m-%d')
+    index, covered = _load_index(date, log_dir)
+    found = []
+    try:
+        with open(log_path(date, log_dir), 'rb') as f:
+            for offset, length in index.get(player_name, []):
+                f.seek(offset)
+                found.append(_parse(f.read(length), date))
+    except FileNotFoundError:
+        return [submission for submission in _archived_log(date) if submission.get('player_name') == player_name]
+    
+    tail, _ = _read_lines(log_path(date, log_dir), covered)
+    for _, line in tail:
+        submission = _parse(line, date) if line.strip() else None
+        if submission is not None and submission.get('player_name') == player_name:
+            found.append(submission)
+    return [submission for submission in found if submission is not None]
+
+def _archived_log(date):
+    """An archived day's log, or [] if the day has no log at all"""
+    return (read_archived(date) or {}).get('submission_log') or []
+
+def compact(date, log_dir=LOG_DIR):
+    """
+    Index the lines appended to a day's log since the last compaction. Only
+    one process compacts a day at a time; others skip. Returns the number of
+    lines indexed.
+    """
+    with file_lock(f'submissions-{date}', blocking=False) as locked:
+        if not locked:
+            return 0
+        
+        path = index_path(date, log_dir)
+        _drop_partial_line(path)
+        lines, _ = _read_lines(log_path(date, log_dir), _covered_offset(date, log_dir))
+        if not lines:
+            return 0
+        
+        entries = []
+        for offset, line in lines:
+            submission = _parse(line, date) if line.strip() else None
+            # Blank and corrupt lines are indexed without a name so they are not read again
+            name = submission.get('player_name', '') if isinstance(submission, dict) else None
+            entries.append(json.dumps([name, offset, len(line)], separators=(',', ':')) + '\n')
+        _append(path, ''.join(entries).encode('utf-8'))
+        return len(entries)
+
+def _drop_partial_line(path):
+    """Cut off an index line left incomplete by a crash mid-append"""
+    try:
+        with open(path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(max(0, size - INDEX_TAIL_BYTES))
+            tail = f.read()
+            if tail.endswith(b'\n'):
+                return
+            if b'\n' not in tail:
+                f.seek(0)
+                tail = f.read()
+            f.truncate(size - len(tail) + tail.rfind(b'\n') + 1)
+    except FileNotFoundError:
+        pass
+
+def compact_pending(log_dir=LOG_DIR):
+    """
+    Compact every day whose log has grown past its index, including days
+    left behind when the process stopped. Returns the number of lines indexed.
+    """
+    if not os.path.isdir(log_dir):
+        return 0
+    indexed = 0
+    for filename in sorted(os.listdir(log_dir)):
+        if not filename.endswith('.ndjson'):
+            continue
+        date = filename[:-len('.ndjson')]
+        if os.path.getsize(os.path.join(log_dir, filename)) > _covered_offset(date, log_dir):
+            indexed += compact(date, log_dir)
+    return indexed
+
+def start_compactor(interval=300, log_dir=LOG_DIR):
+    """Compact pending logs now and then every `interval` seconds on a daemon thread"""
+    def run():
+        stop = threading.Event()
+        while True:
+            try:
+                compact_pending(log_dir)
+            except Exception as e:
+                logger.error(f"Error compacting submission log: {str(e)}")
+            if stop.wait(interval):
+                return
+    
+    thread = threading.Thread(target=run, name='submission-log-compactor', daemon=True)
+    thread.start()
+    return thread
+
+def import_legacy(path='data/submissions.json', log_dir=LOG_DIR):
+    """
+    Move submissions from the old single JSON file into the per-day logs.
+    Submissions already in a day's log (same player and timestamp) are
+    skipped, so importing twice adds nothing. Returns the number imported.
+    """
+    with open(path, 'r') as f:
+        submissions = json.load(f)
+    
+    by_date = {}
+    for submission in submissions:
+        date = (submission.get('timestamp') or datetime.now().isoformat())[:10]
+        by_date.setdefault(date, []).append(submission)
+    
+    imported = 0
+    for date, day_submissions in sorted(by_date.items()):
+        seen = {(sub.get('player_name'), sub.get('timestamp')) for sub in read_submissions(date, log_dir)}
+        for submission in day_submissions:
+            key = (submission.get('player_name'), submission.get('timestamp'))
+            if key not in seen:
+                append_submission(submission, date, log_dir)
+                seen.add(key)
+                imported += 1
+    return imported
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the /api/submit_team submission logs")
+    parser.add_argument('command', choices=['compact', 'import-legacy'])
+    parser.add_argument('--legacy-file', default='data/submissions.json')
+    args = parser.parse_args()
+    
+    if args.command == 'compact':
+        print(f"Indexed {compact_pending()} submissions")
+    else:
+        print(f"Imported {import_legacy(args.legacy_file)} submissions from {args.legacy_file}")
+
+if __name__ == "__main__":
+    main()
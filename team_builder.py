@@ -1,6 +1,6 @@
-import random
-import json
 from team_simulator import TeamSimulator
+from pool_binary import load_player_pool as load_pool_data
+from pool_sampling import sample_players
 from season_simulator import SeasonSimulator, display_season_stats
 import sys
 import time
@@ -8,15 +8,14 @@ import time
 def load_player_pool():
     """Load the player pool from the JSON file"""
     try:
-        with open('player_pool.json', 'r') as f:
-            player_pool = json.load(f)
-            print(f"Loaded player pool with {sum(len(players) for players in player_pool.values())} players")
-            print(f"Number of players in each category:")
-            for cost, players in player_pool.items():
-                print(f"{cost}: {len(players)} players")
-                if players:
-                    print(f"First player in {cost}: {players[0]['name']}")
-            return player_pool
+        player_pool = load_pool_data()
+        print(f"Loaded player pool with {sum(len(players) for players in player_pool.values())} players")
+        print(f"Number of players in each category:")
+        for cost, players in player_pool.items():
+            print(f"{cost}: {len(players)} players")
+            if players:
+                print(f"First player in {cost}: {players[0]['name']}")
+        return player_pool
     except FileNotFoundError:
         print("Error: player_pool.json not found. Please run player_pool_data.py first.")
         sys.exit(1)
@@ -24,8 +23,14 @@ def load_player_pool():
         print(f"Error loading player pool: {e}")
         sys.exit(1)
 
-def get_random_players(player_pool, category, count=5):
-    """Get random players from a specific cost category"""
+def get_random_players(player_pool, category, count=5, rng=None, exclude=None):
+    """
+    Get random players from a specific cost category
+    
+    Args:
+        rng: random.Random instance for reproducible picks
+        exclude: set of player ids that must not be picked
+    """
     if category not in player_pool:
         print(f"Warning: Category {category} not found in player pool")
         return []
@@ -34,11 +39,7 @@ def get_random_players(player_pool, category, count=5):
         print(f"Warning: Not enough players in {category} category (have {len(players)}, need {count})")
         return players
     
-    selected_players = random.sample(players, count)
-    print(f"Selected {len(selected_players)} players from {category} category:")
-    for player in selected_players:
-        print(f"  - {player['name']}")
-    return selected_players
+    return sample_players(players, count, rng=rng, exclude=exclude, key=lambda player: player['id'])
 
 def display_player_options(player_pool, show_stats=False):
     """Display 5 random players from each cost category"""
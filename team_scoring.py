@@ -0,0 +1,109 @@
+"""
+Deterministic lineup scoring for daily challenges.
+
+Uses TeamSimulator's stat weights and normalization caps, applied to the
+player pool's stat names and averaged over the total weight so team
+quality stays on a 0-100 scale. The pool has no true-shooting percentage,
+so TS%'s weight goes to field goal percentage. The logistic win curve is
+centred on the average pool player's quality rather than 50, since a $10
+roster is mostly role players. A lineup's expected record is
+round(82 * win probability). Scores are
+computed for many lineups at once as one matrix operation, which is what
+the challenge scheduler uses to summarize every lineup a day allows.
+"""
+from itertools import combinations
+import numpy as np
+from score_distribution import SEASON_GAMES, summarize
+
+# Bump when the formula changes so stored records can be re-scored
+SCORING_VERSION = 1
+
+BUDGET = 10
+ROSTER_SIZE = 5
+
+# stat -> (weight, value that earns a full score; None for percentages)
+QUALITY_WEIGHTS = {
+    'points': (1.0, 30),
+    'assists': (0.8, 8),
+    'rebounds': (0.7, 12),
+    'steals': (0.6, 2),
+    'blocks': (0.6, 2),
+    'fg_pct': (0.5 + 0.8, None),
+}
+SCORING_FIELDS = list(QUALITY_WEIGHTS)
+
+AVERAGE_QUALITY = 35.0  # Mean player score across player_pool.json; a 41-41 team
+WIN_CURVE_SLOPE = 0.25
+
+def stat_matrix(players):
+    """(n_players x len(SCORING_FIELDS)) matrix of the stats scoring uses"""
+    return np.array(
+        [[float(player['stats'].get(field) or 0.0) for field in SCORING_FIELDS] for player in players],
+        dtype=float
+    ).reshape(len(players), len(SCORING_FIELDS))
+
+def player_scores(stats):
+    """Each player's weighted 0-100 contribution to team quality"""
+    weights = np.array([weight for weight, _ in QUALITY_WEIGHTS.values()])
+    scaled = np.empty_like(stats)
+    for column, (_, cap) in enumerate(QUALITY_WEIGHTS.values()):
+        if cap is None:
+            # Percentages may be stored as 0.48 or 48
+            values = stats[:, column]
+            scaled[:, column] = np.where(values <= 1.0, values * 100, values)
+        else:
+            scaled[:, column] = np.minimum(stats[:, column] / cap, 1.0) * 100
+    return scaled @ weights / weights.sum()
+
+def expected_wins(quality):
+    """Expected wins out of 82 for one or more team quality scores"""
+    win_probability = 1 / (1 + np.exp(-WIN_CURVE_SLOPE * (np.asarray(quality, dtype=float) - AVERAGE_QUALITY)))
+    return np.rint(SEASON_GAMES * win_probability).astype(int)
+
+def score_lineups(scores, lineups):
+    """
+    Expected wins of many lineups at once.
+    
+    Args:
+        scores: per-player scores from player_scores
+        lineups: (n_lineups x ROSTER_SIZE) array of row indexes into scores
+    """
+    return expected_wins(scores[lineups].mean(axis=1))
+
+def feasible_lineups(costs, budget=BUDGET, roster_size=ROSTER_SIZE):
+    """Every roster of distinct players whose total cost fits the budget, as an index array"""
+    costs = np.asarray(costs, dtype=int)
+    lineups = np.array(list(combinations(range(len(costs)), roster_size)), dtype=np.int64)
+    if len(lineups) == 0:
+        return lineups.reshape(0, roster_size)
+    return lineups[costs[lineups].sum(axis=1) <= budget]
+
+def challenge_metadata(player_pool, budget=BUDGET, roster_size=ROSTER_SIZE):
+    """
+    Everything about a challenge's pool that does not depend on submissions:
+    how many lineups fit the budget, the best achievable record and the
+    spread of expected records across all of them.
+    """
+    players = [(int(tier[1:]), player) for tier, tier_players in player_pool.items() for player in tier_players]
+    costs = [cost for cost, _ in players]
+    lineups = feasible_lineups(costs, budget, roster_size)
+    
+    metadata = {
+        'scoring_version': SCORING_VERSION,
+        'budget': budget,
+        'feasible_lineups': int(len(lineups)),
+        'best_record': None,
+        'best_lineup': [],
+        'spread': summarize([0] * (SEASON_GAMES + 1))
+    }
+    if len(lineups) == 0:
+        return metadata
+    
+    wins = score_lineups(player_scores(stat_matrix([player for _, player in players])), lineups)
+    best = int(np.argmax(wins))
+    metadata['best_record'] = {'wins': int(wins[best]), 'losses': SEASON_GAMES - int(wins[best])}
+    metadata['best_lineup'] = [players[row][1].get('id', players[row][1]['name']) for row in lineups[best].tolist()]
+    spread = summarize(np.bincount(wins, minlength=SEASON_GAMES + 1).tolist())
+    del spread['counts']
+    metadata['spread'] = spread
+    return metadata